@@ -1,13 +1,22 @@
 from shapely.geometry import Polygon
 from shapely.affinity import translate
+from sheetmask import SheetRegion
+from kerf import inflated
 import random
 
 class TrianglePacker:
-    def __init__(self, sheet_width, sheet_height, triangles):
+    def __init__(self, sheet_width, sheet_height, triangles, region=None, spacing=0, part_spacing=None):
         self.sheet_width = sheet_width
         self.sheet_height = sheet_height
-        self.triangles = sorted(triangles, key=lambda t: -self.triangle_area(t))  # Sort by area (largest first)
+        # Usable sheet area (outline, holes, defects); a clean rectangle by default
+        self.region = region or SheetRegion.rectangle(sheet_width, sheet_height)
+        # Minimum gap between triangles (kerf); part_spacing overrides it per triangle
+        spacings = [spacing if s is None else s for s in (part_spacing or [None] * len(triangles))]
+        order = sorted(range(len(triangles)), key=lambda i: -self.triangle_area(triangles[i]))  # Sort by area (largest first)
+        self.triangles = [triangles[i] for i in order]
+        self.spacings = [spacings[i] for i in order]
         self.placed_triangles = []
+        self.footprints = []  # Placed triangles grown by half their spacing
     
     def triangle_area(self, triangle):
         """Calculate the area of a triangle given its three points."""
@@ -16,29 +25,30 @@ class TrianglePacker:
                     triangle[2][0] * (triangle[0][1] - triangle[1][1])) / 2)
 
     def is_valid_placement(self, triangle):
-        """Check if a triangle fits within the sheet and doesn't overlap with existing ones."""
+        """Check if a triangle (grown by its spacing) fits within the sheet and doesn't overlap with existing ones."""
         triangle_polygon = Polygon(triangle)
 
-        # Check if it fits inside the sheet
-        if not (0 <= min(x for x, y in triangle) and max(x for x, y in triangle) <= self.sheet_width and
-                0 <= min(y for x, y in triangle) and max(y for x, y in triangle) <= self.sheet_height):
+        # Check if it fits inside the usable sheet area
+        if not self.region.contains(triangle):
             return False
 
-        # Check for overlap with existing triangles
-        for placed in self.placed_triangles:
-            if triangle_polygon.intersects(placed):
+        # Check for overlap with existing triangles (sharing an edge or corner is fine)
+        for placed in self.footprints:
+            if triangle_polygon.intersects(placed) and not triangle_polygon.touches(placed):
                 return False
 
         return True
 
     def place_triangles(self):
         """Greedily place triangles in the sheet."""
-        for triangle in self.triangles:
+        for triangle, spacing in zip(self.triangles, self.spacings):
+            footprint = inflated(tuple(triangle), spacing / 2)  # Grown once per triangle
             for x in range(0, self.sheet_width, 5):  # Small step to check placement
                 for y in range(0, self.sheet_height, 5):
-                    translated_triangle = [(px + x, py + y) for px, py in triangle]
-                    if self.is_valid_placement(translated_triangle):
-                        self.placed_triangles.append(Polygon(translated_triangle))
+                    translated_footprint = [(px + x, py + y) for px, py in footprint]
+                    if self.is_valid_placement(translated_footprint):
+                        self.placed_triangles.append(Polygon([(px + x, py + y) for px, py in triangle]))
+                        self.footprints.append(Polygon(translated_footprint))
                         break  # Move to next triangle after placing
                 else:
                     continue
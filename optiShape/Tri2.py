@@ -1,12 +1,22 @@
 from shapely.geometry import Polygon
 from shapely.affinity import rotate, translate
+from sheetmask import SheetRegion
+from kerf import inflated
 
 class TrianglePacker:
-    def __init__(self, sheet_width, sheet_height, triangles):
+    def __init__(self, sheet_width, sheet_height, triangles, region=None, spacing=0, part_spacing=None):
         self.sheet_width = sheet_width
         self.sheet_height = sheet_height
-        self.triangles = sorted(triangles, key=lambda t: -self.triangle_area(t))  # Sort largest first
+        # Usable sheet area (outline, holes, defects); a clean rectangle by default
+        self.region = region or SheetRegion.rectangle(sheet_width, sheet_height)
+        # Minimum gap between triangles (kerf); part_spacing overrides it per triangle
+        spacings = [spacing if s is None else s for s in (part_spacing or [None] * len(triangles))]
+        order = sorted(range(len(triangles)), key=lambda i: -self.triangle_area(triangles[i]))  # Sort largest first
+        self.triangles = [triangles[i] for i in order]
+        self.spacings = [spacings[i] for i in order]
         self.placed_triangles = []
+        self.footprints = []  # Placed triangles grown by half their spacing
+        self.placed_indices = []  # Triangle index of each placed triangle
         self.grid = [['.' for _ in range(self.sheet_width)] for _ in range(self.sheet_height)]  # ASCII grid
 
     def triangle_area(self, triangle):
@@ -16,40 +26,58 @@ class TrianglePacker:
                     triangle[2][0] * (triangle[0][1] - triangle[1][1])) / 2)
 
     def is_valid_placement(self, triangle):
-        """Check if a triangle fits within the sheet and does not overlap with existing ones."""
+        """Check if a triangle (grown by its spacing) fits within the sheet and does not overlap with existing ones."""
         triangle_polygon = Polygon(triangle)
 
-        # Check if it fits inside the sheet
-        if not (0 <= min(x for x, y in triangle) and max(x for x, y in triangle) <= self.sheet_width and
-                0 <= min(y for x, y in triangle) and max(y for x, y in triangle) <= self.sheet_height):
+        # Check if it fits inside the usable sheet area
+        if not self.region.contains(triangle):
             return False
 
-        # Check for overlap with existing triangles
-        for placed in self.placed_triangles:
-            if triangle_polygon.intersects(placed):
+        # Check for overlap with existing triangles (sharing an edge or corner is fine)
+        for placed in self.footprints:
+            if triangle_polygon.intersects(placed) and not triangle_polygon.touches(placed):
                 return False
 
         return True
 
-    def place_triangles(self):
-        """Place triangles efficiently using rotation and placement optimization."""
+    def iter_placements(self, stop=None):
+        """Place triangles one by one, yielding (triangle_index, polygon) as each is placed.
+
+        The generator returns True if `stop` cut it short, False if it ran to the end.
+        """
         for triangle_index, triangle in enumerate(self.triangles):
+            if stop is not None and stop():
+                return True  # Keep what is placed so far
+
+            placed = False
             for angle in [0, 90, 180, 270]:  # Try different rotations
                 rotated_triangle = [rotate(Polygon(triangle), angle, origin=(0, 0)).exterior.coords[:-1]]
+                footprint = inflated(tuple(rotated_triangle[0]), self.spacings[triangle_index] / 2)  # Once per rotation
 
                 for x in range(0, self.sheet_width, 1):  # Small step size for precise fit
                     for y in range(0, self.sheet_height, 1):
-                        translated_triangle = [(px + x, py + y) for px, py in rotated_triangle[0]]
-                        if self.is_valid_placement(translated_triangle):
+                        translated_footprint = [(px + x, py + y) for px, py in footprint]
+                        if self.is_valid_placement(translated_footprint):
+                            translated_triangle = [(px + x, py + y) for px, py in rotated_triangle[0]]
                             self.placed_triangles.append(Polygon(translated_triangle))
+                            self.footprints.append(Polygon(translated_footprint))
+                            self.placed_indices.append(triangle_index)
                             self.mark_triangle_on_grid(translated_triangle, triangle_index)
+                            placed = True
                             break  # Stop once we find a valid placement
                     else:
                         continue
                     break
 
-                if len(self.placed_triangles) == triangle_index + 1:
+                if placed:
+                    yield triangle_index, self.placed_triangles[-1]
                     break  # Move to next triangle after placement
+        return False
+
+    def place_triangles(self):
+        """Place triangles efficiently using rotation and placement optimization."""
+        for _ in self.iter_placements():
+            pass
 
     def mark_triangle_on_grid(self, triangle, triangle_index):
         """Mark the triangle's position on the grid using ASCII characters."""
@@ -58,22 +86,29 @@ class TrianglePacker:
             if 0 <= int(px) < self.sheet_width and 0 <= int(py) < self.sheet_height:
                 self.grid[int(py)][int(px)] = char  # Flip y-axis for correct ASCII display
 
+    def redraw_grid(self):
+        """Redraw the grid from the placed triangles, e.g. after they were moved."""
+        self.grid = [['.' for _ in range(self.sheet_width)] for _ in range(self.sheet_height)]
+        for triangle, triangle_index in zip(self.placed_triangles, self.placed_indices):
+            self.mark_triangle_on_grid(triangle.exterior.coords[:-1], triangle_index)
+
     def display_grid(self):
         """Print the rectangle sheet with placed triangles."""
         print("\n".join("".join(row) for row in reversed(self.grid)))  # Reverse to match coordinate system
 
-# Define sheet size and triangles
-sheet_width = 20
-sheet_height = 10
-triangles = [
-    [(0, 0), (5, 0), (2, 3)],  # Small triangle
-    [(0, 0), (6, 0), (3, 4)],  # Medium triangle
-    [(0, 0), (8, 0), (4, 5)],  # Large triangle
-    [(0, 0), (4, 0), (2, 3)],
-    [(0, 0), (7, 0), (3, 4)]
-]
-
-# Run the optimized triangle packing
-packer = TrianglePacker(sheet_width, sheet_height, triangles)
-packer.place_triangles()
-packer.display_grid()
+if __name__ == "__main__":
+    # Define sheet size and triangles
+    sheet_width = 20
+    sheet_height = 10
+    triangles = [
+        [(0, 0), (5, 0), (2, 3)],  # Small triangle
+        [(0, 0), (6, 0), (3, 4)],  # Medium triangle
+        [(0, 0), (8, 0), (4, 5)],  # Large triangle
+        [(0, 0), (4, 0), (2, 3)],
+        [(0, 0), (7, 0), (3, 4)]
+    ]
+
+    # Run the optimized triangle packing
+    packer = TrianglePacker(sheet_width, sheet_height, triangles)
+    packer.place_triangles()
+    packer.display_grid()
@@ -1,13 +1,31 @@
 import cv2
 import numpy as np
+from functools import lru_cache
+from kerf import offset_convex
+
+EPS = 1e-9
+VERTICES = 6  # Footprints are padded to this many vertices so they stack into one array
+
+@lru_cache(maxsize=None)
+def rotation_matrix(angle):
+    # Rotation matrix for an angle in degrees, computed once per angle
+    angle_rad = np.radians(angle)
+    return np.array([
+        [np.cos(angle_rad), -np.sin(angle_rad)],
+        [np.sin(angle_rad), np.cos(angle_rad)]
+    ])
 
 class Parallelogram:
-    def __init__(self, base, height, angle=0):
+    def __init__(self, base, height, angle=0, spacing=None):
         # Parallelogram's base, height, and angle (in degrees)
         self.base = base
         self.height = height
         self.angle = angle  # Rotation angle (degrees)
+        self.spacing = spacing  # Minimum gap to other pieces; None uses the packer's default
+        self.placed = False
         self.position = (0, 0)
+        self.templates = {}  # angle -> vertices relative to the bottom-left corner
+        self.footprints = {}  # (angle, grow) -> template grown by `grow` on every side
 
     def get_bounding_box(self):
         # Calculate the bounding box for the parallelogram (ignores rotation)
@@ -17,79 +35,182 @@ class Parallelogram:
         # Update the angle of rotation
         self.angle += angle
 
+    def get_template(self):
+        # Skewed and rotated vertices around the bottom-left corner, cached per angle
+        if self.angle not in self.templates:
+            skew = self.height * np.tan(np.radians(self.angle))
+            points = np.array([
+                [0, 0],  # Bottom-left
+                [self.base, 0],  # Bottom-right
+                [self.base - skew, self.height],  # Top-right
+                [-skew, self.height]  # Top-left
+            ])
+            self.templates[self.angle] = np.dot(points, rotation_matrix(self.angle))
+        return self.templates[self.angle]
+
+    def get_footprint(self, grow):
+        # Template grown for spacing, cached per angle. Bevelling the two acute
+        # corners adds up to two vertices; the last vertex is repeated up to
+        # VERTICES so every footprint has the same shape
+        key = (self.angle, grow)
+        if key not in self.footprints:
+            footprint = offset_convex(self.get_template(), grow)
+            self.footprints[key] = np.concatenate([footprint, footprint[[-1] * (VERTICES - len(footprint))]])
+        return self.footprints[key]
+
     def get_rotated_points(self, x, y):
         # Get the 4 points of the parallelogram after rotation
-        angle_rad = np.radians(self.angle)
-        # Points before rotation
-        points = np.array([
-            [x, y],  # Bottom-left
-            [x + self.base, y],  # Bottom-right
-            [x + self.base - self.height * np.tan(angle_rad), y + self.height],  # Top-right
-            [x - self.height * np.tan(angle_rad), y + self.height]  # Top-left
-        ], dtype=np.float32)
-
-        # Rotation matrix
-        rotation_matrix = np.array([
-            [np.cos(angle_rad), -np.sin(angle_rad)],
-            [np.sin(angle_rad), np.cos(angle_rad)]
-        ])
-        # Rotate points around the bottom-left corner (x, y)
-        rotated_points = np.dot(points - [x, y], rotation_matrix) + [x, y]
-        return rotated_points.astype(np.int32)
-
-def can_place(sheet, parallelogram, x, y, occupied):
-    # Check if the parallelogram can be placed at (x, y) without overlapping
-    rotated_points = parallelogram.get_rotated_points(x, y)
-    
-    # Check if any part of the parallelogram goes out of bounds
-    if np.any(rotated_points[:, 0] < 0) or np.any(rotated_points[:, 0] >= sheet.shape[1]) or \
-       np.any(rotated_points[:, 1] < 0) or np.any(rotated_points[:, 1] >= sheet.shape[0]):
-        return False
-
-    # Check for overlap with other parallelograms
-    for ox, oy, ow, oh in occupied:
-        if not (x + ow <= ox or x >= ox + ow or y + oh <= oy or y >= oy + oh):
-            return False
-    return True
+        return self.get_template() + [x, y]
+
+def overlaps(candidates, placed):
+    # Separating axis test between every candidate and every placed convex polygon.
+    # candidates: (C, V, 2), placed: (N, V, 2) -> (C,) True where a candidate overlaps
+    # anything. Polygons that only touch along an edge do not overlap.
+    hit = np.zeros(len(candidates), dtype=bool)
+    if len(placed) == 0:
+        return hit
+
+    # Broad phase: only pairs whose bounding boxes intersect go through the exact test
+    low_c, high_c = candidates.min(axis=1), candidates.max(axis=1)
+    low_p, high_p = placed.min(axis=1), placed.max(axis=1)
+    near = np.all((low_c[:, None] < high_p[None] - EPS) & (low_p[None] < high_c[:, None] - EPS), axis=-1)
+    ci, pi = np.nonzero(near)
+    if len(ci) == 0:
+        return hit
+    a, b = candidates[ci], placed[pi]  # (P, V, 2) each
+
+    # A pair is apart if some edge normal of either polygon separates their projections.
+    # Repeated (padding) vertices give zero-length edges, which separate nothing
+    axes = np.concatenate([np.roll(a, -1, axis=1) - a, np.roll(b, -1, axis=1) - b], axis=1)
+    axes = np.stack([-axes[..., 1], axes[..., 0]], axis=-1)  # (P, 2V, 2)
+    proj_a = np.einsum("pvk,pak->pav", a, axes)
+    proj_b = np.einsum("pvk,pak->pav", b, axes)
+    separates = (proj_a.max(-1) <= proj_b.min(-1) + EPS) | (proj_b.max(-1) <= proj_a.min(-1) + EPS)
+    apart = (separates & np.any(axes != 0, axis=-1)).any(-1)
+    hit[ci[~apart]] = True
+    return hit
+
+def interior(pixels):
+    # Keep only pixels whose whole 3x3 neighbourhood is filled: they lie strictly
+    # inside the polygon even after its vertices were rounded, so two pieces that
+    # only touch never share one
+    return cv2.erode(pixels, np.ones((3, 3), np.uint8), borderType=cv2.BORDER_CONSTANT, borderValue=0)
+
+def feasibility_map(mask, template, y_start, y_stop):
+    # For reference points (x, y) with y_start <= y < y_stop, whether the rasterized
+    # piece stays on the sheet and misses every occupied pixel. Only interior pixels
+    # are rasterized, so the map never rules out a position where pieces just
+    # touch; exact geometry has the final say. Returns the map and the x of its
+    # first column.
+    rows, cols = mask.shape
+    low = np.floor(template.min(axis=0)).astype(int)
+    high = np.ceil(template.max(axis=0)).astype(int)
+    width, height = high - low + 1
+    x0 = int(np.ceil(-template[:, 0].min()))
+    x1 = int(np.floor(cols - 1 - template[:, 0].max()))
+    y0 = max(y_start, int(np.ceil(-template[:, 1].min())))
+    y1 = min(y_stop - 1, int(np.floor(rows - 1 - template[:, 1].max())))
+    if x1 < x0 or y1 < y0:
+        return np.zeros((0, 0), dtype=bool), x0
+
+    kernel = np.zeros((height, width), dtype=np.uint8)
+    cv2.fillPoly(kernel, [np.round(template - low).astype(np.int32)], 1)
+    kernel = interior(kernel)
+
+    # Dilating the occupied pixels by the piece marks every reference point whose
+    # footprint hits one; the window below stays inside the sheet by construction
+    window = mask[y0 + low[1]:y1 + low[1] + height, x0 + low[0]:x1 + low[0] + width]
+    if kernel.any():
+        hits = cv2.dilate(window, kernel, anchor=(0, 0), borderType=cv2.BORDER_CONSTANT, borderValue=0)
+    else:
+        hits = np.zeros_like(window)  # Too thin to have interior pixels; the exact test decides
+    feasible = np.zeros((y1 - y_start + 1, x1 - x0 + 1), dtype=bool)
+    feasible[y0 - y_start:] = hits[:y1 - y0 + 1, :x1 - x0 + 1] == 0
+    return feasible, x0
+
+def find_position(mask, parallelogram, occupied, region=None, grow=0, band=32, batch=16):
+    # First (row-major) position whose rasterized footprint is free and which
+    # passes the exact overlap test against every placed piece. Rows are scanned in
+    # bands so a full sheet map is rarely needed, and the exact test runs on small,
+    # doubling batches because the raster is usually right. Blocked pixels of the
+    # region are already in `mask`; the region only confirms the final position.
+    # Everything here works on the footprint grown by `grow` (half the spacing).
+    template = parallelogram.get_footprint(grow)
+    if not np.isfinite(template).all():
+        return None  # Degenerate piece, e.g. skewed by 90 degrees
+    rows = mask.shape[0]
+
+    # A piece covers a pixel in every row it spans, so rows that are already full
+    # rule out every reference point whose footprint reaches them
+    free_rows = np.flatnonzero(mask.min(axis=1) == 0)
+    if len(free_rows) == 0:
+        return None
+    y_start = max(0, free_rows[0] - int(np.floor(template[:, 1].min())))
+
+    for y_band in range(y_start, rows, band):
+        feasible, x0 = feasibility_map(mask, template, y_band, y_band + band)
+        ys, xs = np.nonzero(feasible)
+        start, size = 0, batch
+        while start < len(ys):
+            positions = np.stack([xs[start:start + size] + x0, ys[start:start + size] + y_band], axis=1)
+            candidates = template[None] + positions[:, None, :]
+            clear = np.flatnonzero(~overlaps(candidates, occupied))
+            if region is not None and region.irregular:
+                clear = [k for k in clear if region.contains(candidates[k])]
+            if len(clear):
+                return tuple(int(v) for v in positions[clear[0]])
+            start += size
+            size *= 2
+    return None
 
 def draw_parallelogram(sheet, parallelogram, x, y):
     # Draw the parallelogram on the sheet
-    rotated_points = parallelogram.get_rotated_points(x, y)
+    rotated_points = np.round(parallelogram.get_rotated_points(x, y)).astype(np.int32)
     color = tuple(np.random.randint(0, 255, 3).tolist())
     cv2.fillPoly(sheet, [rotated_points], color)
 
-def place_parallelograms(sheet_size, parallelograms):
+def place_parallelograms(sheet_size, parallelograms, stop=None, region=None, spacing=0):
     sheet = np.ones((sheet_size[0], sheet_size[1], 3), dtype=np.uint8) * 255
-    occupied = []
+    mask = np.zeros((sheet_size[0], sheet_size[1]), dtype=np.uint8)  # Occupied pixels
+    if region is not None and region.irregular:
+        mask |= region.blocked  # Holes and defects start out occupied
+    occupied = np.empty((0, VERTICES, 2))  # Exact vertices of every placed piece's footprint
 
     for parallelogram in parallelograms:
-        placed = False
-        for y in range(sheet_size[0]):
-            for x in range(sheet_size[1]):
-                # Try to place the parallelogram at every possible position and check if it fits
-                if can_place(sheet, parallelogram, x, y, occupied):
-                    parallelogram.position = (x, y)
-                    occupied.append((x, y, parallelogram.base, parallelogram.height))
-                    draw_parallelogram(sheet, parallelogram, x, y)
-                    placed = True
-                    break
-            if placed:
-                break
+        # Optional stop signal: keep what is placed so far and return early
+        if stop is not None and stop():
+            break
+
+        # Each piece grows by half its spacing, so neighbours end up a full gap apart
+        grow = (spacing if parallelogram.spacing is None else parallelogram.spacing) / 2
+        position = find_position(mask, parallelogram, occupied, region, grow)
+        if position is None:
+            continue
+        x, y = position
+        parallelogram.placed = True
+        parallelogram.position = (x, y)
+        footprint = parallelogram.get_footprint(grow) + [x, y]
+        occupied = np.concatenate([occupied, footprint[None]])
+        pixels = np.zeros_like(mask)
+        cv2.fillPoly(pixels, [np.round(footprint).astype(np.int32)], 1)
+        mask |= interior(pixels)
+        draw_parallelogram(sheet, parallelogram, x, y)
     return sheet
 
-# Example usage:
-parallelograms = [
-    Parallelogram(60, 30, angle=0),
-    Parallelogram(80, 40, angle=30),
-    Parallelogram(100, 50, angle=45),
-    Parallelogram(40, 20, angle=60),
-    Parallelogram(50, 30, angle=90)
-]
-
-sheet_size = (500, 500)  # Rectangular sheet size
-sheet = place_parallelograms(sheet_size, parallelograms)
-
-# Display the result
-cv2.imshow("Packed Parallelograms", sheet)
-cv2.waitKey(0)
-cv2.destroyAllWindows()
+if __name__ == "__main__":
+    # Example usage:
+    parallelograms = [
+        Parallelogram(60, 30, angle=0),
+        Parallelogram(80, 40, angle=30),
+        Parallelogram(100, 50, angle=45),
+        Parallelogram(40, 20, angle=60),
+        Parallelogram(50, 30, angle=90)
+    ]
+
+    sheet_size = (500, 500)  # Rectangular sheet size
+    sheet = place_parallelograms(sheet_size, parallelograms)
+
+    # Display the result
+    cv2.imshow("Packed Parallelograms", sheet)
+    cv2.waitKey(0)
+    cv2.destroyAllWindows()
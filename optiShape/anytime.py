@@ -0,0 +1,95 @@
+import time
+
+import numpy as np
+
+from circletry3 import iter_pack_shapes
+from nesting1 import iter_nest_parts
+
+class StopSignal:
+    """Stop flag shared between a consumer and a running packer."""
+
+    def __init__(self):
+        self.stopped = False
+
+    def set(self):
+        self.stopped = True
+
+    def __call__(self):
+        return self.stopped
+
+def stream(placements, layout, every=0.5):
+    """Turn a placement generator into an anytime event stream.
+
+    Yields ("placement", item) for every placed piece, ("layout", snapshot) at most
+    every `every` seconds while the packer runs, and a final ("layout", snapshot)
+    when it finishes or `stop` fires. Snapshots come from layout(finished) and
+    always contain everything placed so far; `finished` is True only for the final
+    snapshot of a packer that ran to the end (its generator returned False).
+    """
+    last = time.monotonic()
+    placements = iter(placements)
+    while True:
+        try:
+            item = next(placements)
+        except StopIteration as done:
+            stopped = bool(done.value)
+            break
+        yield "placement", item
+        if time.monotonic() - last >= every:
+            last = time.monotonic()
+            yield "layout", layout(False)
+    yield "layout", layout(not stopped)
+
+def anytime_triangles(packer, every=0.5, stop=None):
+    # packer: a Tri2.TrianglePacker; placements are (triangle_index, polygon).
+    # "complete" means the packer finished and placed every triangle.
+    def layout(finished):
+        return {"placed": [list(p.exterior.coords[:-1]) for p in packer.placed_triangles],
+                "complete": finished and len(packer.placed_triangles) == len(packer.triangles)}
+    return stream(packer.iter_placements(stop=stop), layout, every)
+
+def anytime_shapes(sheet_size, shapes, every=0.5, stop=None):
+    # circletry3 shapes; placements are the Shape objects as they get their position
+    sheet = np.ones((sheet_size[0], sheet_size[1], 3), dtype=np.uint8) * 255
+    def layout(finished):
+        return {"placed": [(shape, shape.position) for shape in shapes if shape.placed],
+                "sheet": sheet.copy(), "complete": finished and all(shape.placed for shape in shapes)}
+    return stream(iter_pack_shapes(sheet, shapes, stop=stop), layout, every)
+
+def anytime_nesting(sheet, parts, every=0.5, stop=None):
+    # nesting1 Sheet and Parts; placements are the Part objects once added to the sheet
+    def layout(finished):
+        on_sheet = {id(part) for part in sheet.parts}
+        return {"placed": [(part, part.x_offset, part.y_offset) for part in sheet.parts],
+                "used_area": sheet.used_area,
+                "complete": finished and all(id(part) in on_sheet for part in parts)}
+    return stream(iter_nest_parts(sheet, parts, stop=stop), layout, every)
+
+def run(events, on_placement=None, on_layout=None):
+    """Callback form of the stream: calls the handlers and returns the last layout."""
+    final = None
+    for kind, payload in events:
+        if kind == "placement":
+            if on_placement is not None:
+                on_placement(payload)
+        else:
+            final = payload
+            if on_layout is not None:
+                on_layout(payload)
+    return final
+
+
+if __name__ == "__main__":
+    from circletry3 import Shape
+
+    shapes = [Shape("rectangle", (100, 50)), Shape("circle", (50,)), Shape("square", (40,)),
+              Shape("triangle", (60, 30)), Shape("rectangle", (80, 40)), Shape("circle", (10,))]
+    stop = StopSignal()
+
+    def on_placement(shape):
+        print(f"Placed {shape.type} {shape.dims} at {shape.position}")
+        if shape.type == "triangle":
+            stop.set()  # Enough to start cutting; the rest is left unplaced
+
+    result = run(anytime_shapes((300, 500), shapes, stop=stop), on_placement=on_placement)
+    print(f"{len(result['placed'])} shapes placed, complete: {result['complete']}")
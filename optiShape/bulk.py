@@ -0,0 +1,255 @@
+import math
+from functools import lru_cache
+from itertools import islice
+
+import cv2
+import numpy as np
+
+# Memory-bounded packing for very large orders (100k+ pieces). Pieces are read
+# from disk in chunks into compact numpy records instead of Shape objects, and
+# buffered by size class (powers of two of the longest side). When the buffer
+# is full, the class with the largest pieces is packed as one group. Sheets are
+# occupancy bitmaps on a grid of `cell` units, stored one bit per cell; only the
+# sheet being filled is unpacked. Placements are written out as they happen.
+#
+# Peak memory is set by the configuration, not the order size, roughly:
+#   buffer_size * 24 bytes + max_open_sheets * cells / 8 + 16 * cells bytes
+# where cells = (sheet height / cell) * (sheet width / cell).
+
+KINDS = ("rectangle", "square", "circle", "triangle")
+
+PIECE = np.dtype([("id", np.int64), ("kind", np.uint8), ("width", np.float32), ("height", np.float32)])
+
+def read_pieces(path, chunk_size=10000):
+    """Yield chunks of pieces from a CSV file with one `type,dim[,dim]` line per piece.
+
+    dims are as for circletry3.Shape. Blank lines, `#` comments and a `type,...`
+    header are skipped; the id of a piece is its index among the pieces read.
+    """
+    index = 0
+    with open(path) as f:
+        while True:
+            lines = list(islice(f, chunk_size))
+            if not lines:
+                return
+            chunk = np.zeros(len(lines), dtype=PIECE)
+            n = 0
+            for line in lines:
+                fields = line.strip().split(",")
+                if not fields[0] or fields[0].startswith("#") or fields[0] == "type":
+                    continue
+                kind, dims = fields[0], [float(d) for d in fields[1:]]
+                if kind == "circle":
+                    width = height = 2 * dims[0]
+                elif kind == "square":
+                    width = height = dims[0]
+                elif kind in ("rectangle", "triangle"):
+                    width, height = dims
+                else:
+                    raise ValueError(f"Unknown shape type: {kind!r}")
+                chunk[n] = (index, KINDS.index(kind), width, height)
+                index += 1
+                n += 1
+            if n:
+                yield chunk[:n]
+
+def size_class(pieces):
+    """Size class of each piece: floor(log2) of its longest side."""
+    longest = np.maximum(np.maximum(pieces["width"], pieces["height"]), 1)
+    return np.floor(np.log2(longest)).astype(int)
+
+@lru_cache(maxsize=4096)
+def footprint(kind, width, height, grow, cell):
+    """Cells covered by a piece grown by `grow`, as a uint8 template (1 = covered).
+
+    A cell counts as covered if any part of the grown piece reaches into it, so
+    pieces on disjoint cells never overlap.
+    """
+    cols = int(math.ceil((width + 2 * grow) / cell - 1e-9))
+    rows = int(math.ceil((height + 2 * grow) / cell - 1e-9))
+    template = np.ones((rows, cols), dtype=np.uint8)
+    edges_x = np.arange(cols + 1) * cell
+    edges_y = np.arange(rows + 1) * cell
+
+    if KINDS[kind] == "circle":
+        # Distance from the center to the nearest point of each cell
+        r = width / 2 + grow
+        dx = np.maximum(np.maximum(edges_x[:-1] - r, r - edges_x[1:]), 0)
+        dy = np.maximum(np.maximum(edges_y[:-1] - r, r - edges_y[1:]), 0)
+        template = (dx[None, :] ** 2 + dy[:, None] ** 2 <= r * r).astype(np.uint8)
+    elif KINDS[kind] == "triangle":
+        # Apex at the top middle, as circletry3 draws it; the triangle is widest at
+        # the bottom of each row, so each row spans the (grown) width found there
+        depth = np.clip(edges_y[1:], 0, height)
+        half = width / 2 * depth / height
+        left = np.floor((width / 2 - half) / cell).astype(int)
+        right = np.ceil((width / 2 + half + 2 * grow) / cell).astype(int)
+        columns = np.arange(cols)
+        template = ((columns[None, :] >= left[:, None]) & (columns[None, :] < right[:, None])).astype(np.uint8)
+    return template
+
+def window_free(grid, rows, cols):
+    """True where a rows x cols box with its top-left corner there covers no occupied cell."""
+    table = cv2.integral(grid)
+    sums = table[rows:, cols:] - table[:-rows, cols:] - table[rows:, :-cols] + table[:-rows, :-cols]
+    return sums == 0
+
+
+class BitmapSheet:
+    """Occupancy of one sheet on the cell grid, kept bit-packed (8 cells per byte)."""
+
+    def __init__(self, index, rows, cols):
+        self.index = index
+        self.cols = cols
+        self.bits = np.zeros((rows, (cols + 7) // 8), dtype=np.uint8)
+
+    def unpack(self):
+        return np.unpackbits(self.bits, axis=1, count=self.cols)
+
+    def store(self, grid):
+        self.bits = np.packbits(grid, axis=1)
+
+
+class BulkPacker:
+    """Packs chunks of pieces group by group onto bitmap sheets, writing placements to `out`.
+
+    Each output line is `id,sheet,x,y` with (x, y) the top-left corner of the
+    piece's bounding box, as in circletry3; pieces larger than a sheet get
+    sheet -1 and no position. At most `max_open_sheets` sheets take new pieces;
+    opening one more closes the oldest.
+    """
+
+    def __init__(self, sheet_size, out, cell=1, spacing=0, buffer_size=50000, max_open_sheets=4):
+        self.rows = int(sheet_size[0] // cell)
+        self.cols = int(sheet_size[1] // cell)
+        self.out = out
+        self.cell = cell
+        self.grow = spacing / 2  # Each piece keeps half the spacing, also from the sheet edge
+        self.buffer_size = buffer_size
+        self.max_open_sheets = max_open_sheets
+        self.buffers = {}  # size class -> list of piece chunks
+        self.buffered = 0
+        self.sheets = []  # Open sheets, oldest first
+        self.sheet_count = 0
+        self.pieces = 0
+        self.placed = 0
+
+    def add(self, chunk):
+        classes = size_class(chunk)
+        for value in np.unique(classes):
+            self.buffers.setdefault(int(value), []).append(chunk[classes == value])
+        self.buffered += len(chunk)
+        self.pieces += len(chunk)
+        while self.buffered > self.buffer_size:
+            self.flush(max(self.buffers))
+
+    def flush(self, group):
+        pieces = np.concatenate(self.buffers.pop(group))
+        self.buffered -= len(pieces)
+        # Tallest first; equal footprints end up next to each other
+        self.pack_group(pieces[np.lexsort((pieces["width"], pieces["height"]))[::-1]])
+
+    def finish(self):
+        """Pack everything still buffered, largest classes first, and return the counts."""
+        while self.buffers:
+            self.flush(max(self.buffers))
+        self.sheets = []
+        return {"pieces": self.pieces, "placed": self.placed, "sheets": self.sheet_count}
+
+    def pack_group(self, pieces):
+        fits = np.array([self.fits(piece) for piece in pieces], dtype=bool)
+        for piece in pieces[~fits]:
+            self.out.write(f"{piece['id']},-1,,\n")
+        remaining = pieces[fits]
+        for sheet in self.sheets:
+            if not len(remaining):
+                return
+            remaining = self.fill(sheet, remaining)
+        while len(remaining):
+            remaining = self.fill(self.open_sheet(), remaining)
+
+    def fits(self, piece):
+        rows, cols = self.template(piece).shape
+        return rows <= self.rows and cols <= self.cols
+
+    def template(self, piece):
+        return footprint(int(piece["kind"]), float(piece["width"]), float(piece["height"]), self.grow, self.cell)
+
+    def open_sheet(self):
+        if len(self.sheets) >= self.max_open_sheets:
+            self.sheets.pop(0)  # Its placements are already written out
+        sheet = BitmapSheet(self.sheet_count, self.rows, self.cols)
+        self.sheet_count += 1
+        self.sheets.append(sheet)
+        return sheet
+
+    def fill(self, sheet, pieces):
+        """Place pieces on a sheet at the top-left-most free cells; returns those that did not fit."""
+        grid = sheet.unpack()
+        left = np.zeros(len(pieces), dtype=bool)
+        shape, free, start = None, None, 0
+        for i, piece in enumerate(pieces):
+            template = self.template(piece)
+            rows, cols = template.shape
+            if template.shape != shape:
+                # Feasible corners for this footprint size, reused while the size repeats
+                shape, free, start = template.shape, window_free(grid, rows, cols), 0
+            flat = free.ravel()
+            index = start + int(np.argmax(flat[start:])) if start < len(flat) else start
+            if index >= len(flat) or not flat[index]:
+                left[i] = True
+                start = len(flat)
+                continue
+            start = index + 1  # Placing only removes room, so earlier corners stay infeasible
+            y, x = divmod(index, free.shape[1])
+            grid[y:y + rows, x:x + cols] |= template
+
+            # Only corners whose box reaches the new piece can have changed; a full
+            # box template blocks all of them
+            y0, x0 = max(y - rows + 1, 0), max(x - cols + 1, 0)
+            y1, x1 = min(y + rows, free.shape[0]), min(x + cols, free.shape[1])
+            if template.all():
+                free[y0:y1, x0:x1] = False
+            else:
+                free[y0:y1, x0:x1] &= window_free(grid[y0:y1 + rows - 1, x0:x1 + cols - 1], rows, cols)
+
+            self.out.write(f"{piece['id']},{sheet.index},{x * self.cell + self.grow:g},"
+                           f"{y * self.cell + self.grow:g}\n")
+            self.placed += 1
+        sheet.store(grid)
+        return pieces[left]
+
+def pack_bulk(path, out_path, sheet_size, chunk_size=10000, **kwargs):
+    """Pack the pieces listed in `path` onto (height, width) sheets, writing placements to `out_path`.
+
+    Extra arguments go to BulkPacker (cell, spacing, buffer_size, max_open_sheets).
+    Returns {"pieces", "placed", "sheets"}.
+    """
+    with open(out_path, "w") as out:
+        packer = BulkPacker(sheet_size, out, **kwargs)
+        for chunk in read_pieces(path, chunk_size):
+            packer.add(chunk)
+        return packer.finish()
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+    import time
+
+    rng = np.random.default_rng(0)
+    path = os.path.join(tempfile.gettempdir(), "bulk_pieces.csv")
+    with open(path, "w") as f:
+        f.write("type,dim1,dim2\n")
+        # A catalogue of 300 part types, ordered in random quantities and order
+        kinds = rng.choice(KINDS, 300)
+        dims = rng.integers(5, 120, (300, 2))
+        for part in rng.integers(0, 300, 100000):
+            a, b = dims[part]
+            f.write(f"{kinds[part]},{a // 2}\n" if kinds[part] in ("circle", "square") else
+                    f"{kinds[part]},{a},{b}\n")
+
+    start = time.time()
+    result = pack_bulk(path, path + ".out", (1000, 2000), cell=2, spacing=2, buffer_size=20000)
+    print(f"Placed {result['placed']} of {result['pieces']} pieces on {result['sheets']} sheets "
+          f"in {time.time() - start:.1f}s")
@@ -0,0 +1,196 @@
+import numpy as np
+
+EPS = 1e-6
+
+class CirclePacker:
+    """Place circles exactly on a sheet, next to placed circles and rectangular obstacles.
+
+    Placed circle centers are bucketed in a uniform grid so each overlap test and
+    each tangency pair only involves circles in neighbouring cells. Candidate centers are the
+    positions tangent to two things (two circles, a circle and a wall, or two
+    walls) and are tested in vectorized batches.
+    """
+
+    def __init__(self, sheet_width, sheet_height, cell_size=None, region=None):
+        self.sheet_width = sheet_width
+        self.sheet_height = sheet_height
+        self.region = region  # Optional sheetmask.SheetRegion with holes and defects
+        self.cell_size = cell_size
+        self.centers = np.empty((0, 2))
+        self.radii = np.empty(0)
+        self.max_radius = 0.0
+        self.obstacles = np.empty((0, 4))  # (x, y, width, height) boxes
+
+    def add_obstacle(self, x, y, width, height):
+        """Block an axis-aligned box (e.g. a rectangle placed by another pass)."""
+        self.obstacles = np.vstack([self.obstacles, [x, y, width, height]])
+
+    def add_circle(self, cx, cy, r):
+        """Register a circle that is already on the sheet."""
+        if self.cell_size is None:
+            self.cell_size = 2.0 * r
+        self.centers = np.vstack([self.centers, [cx, cy]])
+        self.radii = np.append(self.radii, r)
+        self.max_radius = max(self.max_radius, r)
+
+    def cell_pairs(self, queries, points, reach):
+        """Index pairs (q, p) of queries and points whose grid cells are close enough
+        that the two may be within `reach` of each other.
+
+        Points are bucketed by cell and each query only looks up the cells around
+        its own, so the work grows with the number of close pairs, not queries x points.
+        """
+        # Cells at least reach / 2 wide keep the neighbourhood at most 5 x 5 cells
+        cell = max(self.cell_size or 0.0, reach / 2)
+        if len(queries) == 0 or len(points) == 0:
+            return np.empty(0, dtype=int), np.empty(0, dtype=int)
+        k = int(np.ceil(reach / cell))
+        query_keys = np.floor(queries / cell).astype(np.int64)
+        point_keys = np.floor(points / cell).astype(np.int64)
+        # Cell (x, y) -> x * span + y; a collision between far cells only adds a pair
+        # the exact distance test drops
+        span = int(max(query_keys[:, 1].max(), point_keys[:, 1].max()) -
+                   min(query_keys[:, 1].min(), point_keys[:, 1].min())) + 2 * k + 2
+        codes = point_keys[:, 0] * span + point_keys[:, 1]
+        order = np.argsort(codes, kind="stable")
+        ordered = codes[order]
+
+        found_q, found_p = [], []
+        for ox in range(-k, k + 1):
+            for oy in range(-k, k + 1):
+                target = (query_keys[:, 0] + ox) * span + query_keys[:, 1] + oy
+                lo = np.searchsorted(ordered, target, side="left")
+                counts = np.searchsorted(ordered, target, side="right") - lo
+                total = int(counts.sum())
+                if total == 0:
+                    continue
+                starts = np.repeat(lo - np.cumsum(counts) + counts, counts)
+                found_q.append(np.repeat(np.arange(len(queries)), counts))
+                found_p.append(order[starts + np.arange(total)])
+        if not found_q:
+            return np.empty(0, dtype=int), np.empty(0, dtype=int)
+        return np.concatenate(found_q), np.concatenate(found_p)
+
+    def fits(self, points, r):
+        """Vectorized feasibility of circles of radius r centered at each of `points`."""
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        ok = ((points[:, 0] >= r - EPS) & (points[:, 0] <= self.sheet_width - r + EPS) &
+              (points[:, 1] >= r - EPS) & (points[:, 1] <= self.sheet_height - r + EPS))
+
+        # Holes, defects and irregular outlines: one distance-transform lookup per point
+        if self.region is not None and ok.any():
+            ok &= self.region.circles_free(points, r)
+
+        # Exact circle/box distance: clamp the center into each box
+        if len(self.obstacles) and ok.any():
+            ox, oy, ow, oh = self.obstacles.T
+            px, py = points[:, 0:1], points[:, 1:2]
+            dx = np.maximum(np.maximum(ox - px, px - (ox + ow)), 0)
+            dy = np.maximum(np.maximum(oy - py, py - (oy + oh)), 0)
+            ok &= ~np.any(dx * dx + dy * dy < (r - EPS) ** 2, axis=1)
+
+        # Exact circle/circle distance, only against circles in nearby grid cells
+        if len(self.radii) and ok.any():
+            live = np.flatnonzero(ok)
+            q, p = self.cell_pairs(points[live], self.centers, r + self.max_radius)
+            diff = points[live[q]] - self.centers[p]
+            hit = np.einsum("ij,ij->i", diff, diff) < (self.radii[p] + r - EPS) ** 2
+            ok[live[q[hit]]] = False
+        return ok
+
+    def walls(self, r):
+        """Axis lines a circle of radius r can be tangent to, offset to its center line."""
+        xs = [r, self.sheet_width - r]
+        ys = [r, self.sheet_height - r]
+        for ox, oy, ow, oh in self.obstacles:
+            xs += [ox - r, ox + ow + r]
+            ys += [oy - r, oy + oh + r]
+        return np.array(xs), np.array(ys)
+
+    def candidates(self, r):
+        """All center positions of radius r tangent to two of: walls, box corners, circles."""
+        xs, ys = self.walls(r)
+        found = [np.stack(np.meshgrid(xs, ys), axis=-1).reshape(-1, 2)]
+
+        # Box corners act like circles of radius 0
+        ox, oy, ow, oh = self.obstacles.T
+        corners = np.concatenate([
+            np.stack([ox, oy], axis=1), np.stack([ox + ow, oy], axis=1),
+            np.stack([ox, oy + oh], axis=1), np.stack([ox + ow, oy + oh], axis=1),
+        ])
+        centers = np.vstack([self.centers, corners])
+        reach = np.concatenate([self.radii, np.zeros(len(corners))]) + r
+        if len(centers) == 0:
+            return found[0]
+
+        # Circle + wall: on the wall line, at distance reach from the circle center
+        for lines, axis in ((xs, 0), (ys, 1)):
+            offset = lines[None, :] - centers[:, axis:axis + 1]
+            half = np.sqrt(np.maximum(reach[:, None] ** 2 - offset ** 2, 0))
+            valid = np.abs(offset) <= reach[:, None]
+            other = np.broadcast_to(centers[:, 1 - axis:2 - axis], offset.shape)
+            fixed = np.broadcast_to(lines[None, :], offset.shape)
+            for sign in (-1, 1):
+                pts = np.empty((valid.sum(), 2))
+                pts[:, axis] = fixed[valid]
+                pts[:, 1 - axis] = (other + sign * half)[valid]
+                found.append(pts)
+
+        # Circle + circle: intersections of the two circles grown by r
+        i, j = self.cell_pairs(centers, centers, 2 * (self.max_radius + r))
+        i, j = i[i < j], j[i < j]
+        d = np.linalg.norm(centers[j] - centers[i], axis=1)
+        keep = (d > EPS) & (d <= reach[i] + reach[j]) & (d >= np.abs(reach[i] - reach[j]))
+        i, j, d = i[keep], j[keep], d[keep]
+        if len(d):
+            a = (reach[i] ** 2 - reach[j] ** 2 + d ** 2) / (2 * d)
+            h = np.sqrt(np.maximum(reach[i] ** 2 - a ** 2, 0))
+            unit = (centers[j] - centers[i]) / d[:, None]
+            base = centers[i] + a[:, None] * unit
+            normal = np.stack([-unit[:, 1], unit[:, 0]], axis=1)
+            found.append(base + h[:, None] * normal)
+            found.append(base - h[:, None] * normal)
+
+        return np.vstack(found)
+
+    def place(self, r):
+        """Place a circle of radius r at the top-left-most feasible candidate.
+
+        Returns the center (cx, cy), or None if the circle does not fit anywhere.
+        """
+        points = self.candidates(r)
+        points = points[self.fits(points, r)]
+        if len(points) == 0:
+            return None
+        best = np.lexsort((points[:, 0], points[:, 1]))[0]
+        cx, cy = points[best]
+        self.add_circle(cx, cy, r)
+        return float(cx), float(cy)
+
+    def place_all(self, radii):
+        """Place circles largest first; returns a center or None per input radius."""
+        result = [None] * len(radii)
+        for index in sorted(range(len(radii)), key=lambda k: -radii[k]):
+            result[index] = self.place(radii[index])
+        return result
+
+
+if __name__ == "__main__":
+    import cv2
+
+    sheet_size = (300, 500)  # Sheet size (height, width)
+    packer = CirclePacker(sheet_size[1], sheet_size[0])
+    packer.add_obstacle(0, 0, 200, 100)
+    radii = [50, 40, 30, 30, 20, 20, 20, 10, 10, 10, 5, 5]
+    centers = packer.place_all(radii)
+
+    sheet = np.ones((sheet_size[0], sheet_size[1], 3), dtype=np.uint8) * 255
+    cv2.rectangle(sheet, (0, 0), (200, 100), (128, 128, 128), -1)
+    for r, center in zip(radii, centers):
+        if center is not None:
+            color = tuple(np.random.randint(0, 255, 3).tolist())
+            cv2.circle(sheet, (int(round(center[0])), int(round(center[1]))), r, color, -1)
+
+    cv2.imshow("Packed Circles", sheet)
+    cv2.waitKey(0)
+    cv2.destroyAllWindows()
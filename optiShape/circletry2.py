@@ -1,5 +1,6 @@
 import cv2
 import numpy as np
+from circlepack import CirclePacker
 
 class Shape:
     def __init__(self, shape_type, dims):
@@ -75,19 +76,24 @@ def pack_shapes(sheet_size, shapes):
                 x += width  # Move to the right after placing the shape
                 max_row_height = max(max_row_height, height)
 
-    # Try placing remaining circles in gaps
+    # Try placing remaining circles in gaps, tangent to what is already on the sheet
+    gaps = CirclePacker(sheet_size[1], sheet_size[0])
     for shape in shapes:
+        if shape.placed:
+            px, py = shape.position
+            if shape.type == "circle":
+                r = shape.dims[0]
+                gaps.add_circle(px + r, py + r, r)
+            else:
+                gaps.add_obstacle(px, py, *shape.get_bounding_box())
+    for shape in sorted(shapes, key=lambda s: s.get_bounding_box()[0], reverse=True):
         if shape.type == "circle" and not shape.placed:
             r = shape.dims[0]
-            for i in range(0, sheet_size[1] - 2*r, 5):
-                for j in range(0, sheet_size[0] - 2*r, 5):
-                    if can_place(sheet, i, j, 2*r, 2*r):
-                        shape.placed = True
-                        shape.position = (i, j)
-                        draw_shape(sheet, shape, i, j)
-                        break
-                if shape.placed:
-                    break
+            center = gaps.place(r)
+            if center is not None:
+                shape.placed = True
+                shape.position = (center[0] - r, center[1] - r)
+                draw_shape(sheet, shape, int(round(center[0])) - r, int(round(center[1])) - r)
     
     return sheet
 
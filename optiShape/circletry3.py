@@ -1,10 +1,12 @@
 import cv2
 import numpy as np
+from circlepack import CirclePacker
 
 class Shape:
-    def __init__(self, shape_type, dims):
+    def __init__(self, shape_type, dims, spacing=None):
         self.type = shape_type
         self.dims = dims
+        self.spacing = spacing  # Minimum gap to other shapes; None uses the packer's default
         self.placed = False
         self.position = (0, 0)
 
@@ -20,10 +22,15 @@ class Shape:
             base, height = self.dims
             return (base, height)
 
-def can_place(sheet, x, y, width, height, occupied):
-    sheet_height, sheet_width, _ = sheet.shape
-    if x + width > sheet_width or y + height > sheet_height:
-        return False
+def can_place(sheet, x, y, width, height, occupied, region=None):
+    if region is not None:
+        # Usable sheet area with outline, holes and defects: O(1) integral-image lookup
+        if not region.box_free(x, y, width, height):
+            return False
+    else:
+        sheet_height, sheet_width, _ = sheet.shape
+        if x + width > sheet_width or y + height > sheet_height:
+            return False
     # Check if the position overlaps with already placed shapes
     for ox, oy, ow, oh in occupied:
         if not (x + width <= ox or x >= ox + ow or y + height <= oy or y >= oy + oh):
@@ -46,54 +53,99 @@ def draw_shape(sheet, shape, x, y):
         pts = np.array([[x, y + height], [x + base, y + height], [x + base // 2, y]], np.int32)
         cv2.fillPoly(sheet, [pts], color)
 
-def pack_shapes(sheet_size, shapes):
-    sheet = np.ones((sheet_size[0], sheet_size[1], 3), dtype=np.uint8) * 255
+def iter_pack_shapes(sheet, shapes, stop=None, region=None, spacing=0, placed=()):
+    # Place shapes one by one on `sheet`, yielding each shape as soon as it is placed.
+    # Shapes in `placed` are already on the sheet (e.g. a warm start) and stay put.
+    # The generator returns True if `stop` cut it short, False if it ran to the end.
+    sheet_size = sheet.shape[:2]
     occupied = []  # List to store occupied areas (x, y, width, height)
 
     # Sort shapes: First place larger shapes first to prevent leaving gaps
     shapes_sorted = sorted(shapes, key=lambda s: s.get_bounding_box()[0] * s.get_bounding_box()[1], reverse=True)
 
+    # Circles are placed exactly, tangent to their neighbours, instead of by their bounding box
+    circles = CirclePacker(sheet_size[1], sheet_size[0], region=region)
+
+    for shape in placed:
+        grow = (spacing if shape.spacing is None else shape.spacing) / 2
+        width, height = shape.get_bounding_box()
+        x, y = shape.position
+        occupied.append((x - grow, y - grow, width + 2 * grow, height + 2 * grow))
+        if shape.type == "circle":
+            r = shape.dims[0]
+            circles.add_circle(x + r, y + r, r + grow)
+        else:
+            circles.add_obstacle(x - grow, y - grow, width + 2 * grow, height + 2 * grow)
+        draw_shape(sheet, shape, int(round(x)), int(round(y)))
+
     for shape in shapes_sorted:
+        # Optional stop signal: keep what is placed so far and return early
+        if stop is not None and stop():
+            return True
+
+        # Reserve the shape grown by half its spacing on every side (kerf)
+        grow = (spacing if shape.spacing is None else shape.spacing) / 2
         width, height = shape.get_bounding_box()
+        width, height = width + 2 * grow, height + 2 * grow
+
+        if shape.type == "circle":
+            r = shape.dims[0]
+            center = circles.place(r + grow)
+            if center is not None:
+                shape.placed = True
+                shape.position = (center[0] - r, center[1] - r)
+                occupied.append((center[0] - r - grow, center[1] - r - grow, width, height))
+                draw_shape(sheet, shape, int(round(center[0])) - r, int(round(center[1])) - r)
+                yield shape
+            continue
 
         # Try to place the shape in all available positions
         placed = False
-        for y in range(sheet_size[0] - height + 1):
-            for x in range(sheet_size[1] - width + 1):
-                if can_place(sheet, x, y, width, height, occupied):
+        for y in range(int(sheet_size[0] - height) + 1):
+            for x in range(int(sheet_size[1] - width) + 1):
+                if can_place(sheet, x, y, width, height, occupied, region):
                     shape.placed = True
-                    shape.position = (x, y)
+                    shape.position = (x + grow, y + grow)
                     occupied.append((x, y, width, height))  # Mark the area as occupied
-                    draw_shape(sheet, shape, x, y)
+                    circles.add_obstacle(x, y, width, height)
+                    draw_shape(sheet, shape, int(round(x + grow)), int(round(y + grow)))
                     placed = True
                     break
             if placed:
                 break
+        if placed:
+            yield shape
+    return False
 
+def pack_shapes(sheet_size, shapes, stop=None, region=None, spacing=0):
+    sheet = np.ones((sheet_size[0], sheet_size[1], 3), dtype=np.uint8) * 255
+    for _ in iter_pack_shapes(sheet, shapes, stop=stop, region=region, spacing=spacing):
+        pass
     return sheet
 
-# Example Usage with Multiple Shapes including Very Small Ones
-
-shapes = [
-    Shape("rectangle", (100, 50)),
-    Shape("circle", (50,)),
-    Shape("circle", (30,)),
-    Shape("circle", (20,)),
-    Shape("square", (40,)),
-    Shape("triangle", (60, 30)),
-    Shape("rectangle", (80, 40)),
-    Shape("rectangle", (200, 100)),
-    Shape("circle", (10,)),  # Very small circle
-    Shape("square", (10,)),  # Very small square
-    Shape("triangle", (20, 10)),  # Small triangle
-    Shape("triangle", (5, 15)),   # Very small triangle
-    Shape("rectangle", (5, 5)),   # Very small rectangle
-    Shape("circle", (5,))         # Very small circle
-]
-
-sheet_size = (300, 500)  # Sheet size (height, width)
-sheet = pack_shapes(sheet_size, shapes)
-
-cv2.imshow("Packed Sheet", sheet)
-cv2.waitKey(0)
-cv2.destroyAllWindows()
+if __name__ == "__main__":
+    # Example Usage with Multiple Shapes including Very Small Ones
+
+    shapes = [
+        Shape("rectangle", (100, 50)),
+        Shape("circle", (50,)),
+        Shape("circle", (30,)),
+        Shape("circle", (20,)),
+        Shape("square", (40,)),
+        Shape("triangle", (60, 30)),
+        Shape("rectangle", (80, 40)),
+        Shape("rectangle", (200, 100)),
+        Shape("circle", (10,)),  # Very small circle
+        Shape("square", (10,)),  # Very small square
+        Shape("triangle", (20, 10)),  # Small triangle
+        Shape("triangle", (5, 15)),   # Very small triangle
+        Shape("rectangle", (5, 5)),   # Very small rectangle
+        Shape("circle", (5,))         # Very small circle
+    ]
+
+    sheet_size = (300, 500)  # Sheet size (height, width)
+    sheet = pack_shapes(sheet_size, shapes)
+
+    cv2.imshow("Packed Sheet", sheet)
+    cv2.waitKey(0)
+    cv2.destroyAllWindows()
@@ -0,0 +1,228 @@
+import math
+
+import numpy as np
+from shapely.affinity import translate
+
+EPS = 1e-9
+
+# Compaction: after a greedy pass, slide every piece towards the sheet origin
+# (decreasing x, then decreasing y) until it touches a wall or another piece,
+# and repeat until nothing moves. A piece is a convex polygon, or a single
+# point, grown by a radius (0 for polygons, r for circles). How far a piece can
+# slide is computed exactly by casting rays from its vertices against the
+# other piece grown by both radii, and the other way round.
+
+def cross(a, b):
+    return a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]
+
+def unit_normals(polygon):
+    # Unit edge normals pointing out of a convex polygon, whatever its winding
+    edges = np.roll(polygon, -1, axis=0) - polygon
+    normals = np.stack([edges[:, 1], -edges[:, 0]], axis=1)
+    if cross(polygon, np.roll(polygon, -1, axis=0)).sum() < 0:
+        normals = -normals
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return normals / np.linalg.norm(normals, axis=1)[:, None]
+
+def ray_edges(origins, direction, starts, edges, normals, radius):
+    """Smallest t >= 0 where a ray origin + t * direction enters through an edge pushed out by radius.
+
+    radius broadcasts to (origins, edges). Only edges facing the ray count, so
+    pieces that touch but move apart do not block each other.
+    """
+    if len(origins) == 0 or len(starts) == 0:
+        return math.inf
+    denom = cross(direction, edges)  # (E,)
+    offset = starts[None] + np.asarray(radius)[..., None] * normals[None] - origins[:, None]  # (O, E, 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = cross(offset, edges[None]) / denom[None]
+        s = cross(offset, direction) / denom[None]
+    facing = (normals @ direction < -EPS) & (np.abs(denom) > EPS)
+    hit = facing[None] & (t >= -1e-7) & (s >= -EPS) & (s <= 1 + EPS)
+    if not hit.any():
+        return math.inf
+    return max(float(t[hit].min()), 0.0)
+
+def ray_discs(origins, direction, centers, radius):
+    """Smallest t >= 0 where a ray origin + t * direction enters a disc of `radius` around a center."""
+    if len(origins) == 0 or len(centers) == 0:
+        return math.inf
+    radius = np.broadcast_to(radius, (len(origins), len(centers)))
+    w = origins[:, None] - centers[None]  # (O, C, 2)
+    b = w @ direction
+    disc = b * b - (np.einsum("ock,ock->oc", w, w) - radius * radius)
+    with np.errstate(invalid="ignore"):
+        t = -b - np.sqrt(disc)
+    hit = (radius > EPS) & (disc >= 0) & (t >= -1e-7) & (b < 0)
+    if not hit.any():
+        return math.inf
+    return max(float(t[hit].min()), 0.0)
+
+
+class Compactor:
+    """Slides convex pieces towards the origin until no piece moves.
+
+    points: list of (V, 2) vertex arrays, one per movable piece (any vertex count,
+    or a single center point for a circle). radii: how much each piece is grown,
+    e.g. the circle radius; 0 for plain polygons. fixed / fixed_radii: pieces that
+    never move, e.g. defects. Walls are x = 0 and y = 0; sliding towards the
+    origin never reaches the others.
+    """
+
+    def __init__(self, points, radii=None, fixed=(), fixed_radii=None):
+        self.points = [np.asarray(p, dtype=float).reshape(-1, 2).copy() for p in points]
+        self.points += [np.asarray(p, dtype=float).reshape(-1, 2) for p in fixed]
+        self.movable = len(points)
+        radii = [0.0] * len(points) if radii is None else list(radii)
+        fixed_radii = [0.0] * len(fixed) if fixed_radii is None else list(fixed_radii)
+        self.radii = np.array(radii + fixed_radii, dtype=float)
+        self.normals = [unit_normals(p) if len(p) > 2 else np.empty((0, 2)) for p in self.points]
+        self.moved = [np.zeros(2) for _ in range(self.movable)]
+
+    def edges(self, k):
+        piece = self.points[k]
+        if len(piece) <= 2:
+            return np.empty((0, 2)), np.empty((0, 2))
+        return piece, np.roll(piece, -1, axis=0) - piece
+
+    def boxes(self):
+        low = np.array([p.min(axis=0) for p in self.points]).reshape(-1, 2) - self.radii[:, None]
+        high = np.array([p.max(axis=0) for p in self.points]).reshape(-1, 2) + self.radii[:, None]
+        return low, high
+
+    def contact_distance(self, index, axis, low, high):
+        """Distance piece `index` can slide along -axis before contact (walls included)."""
+        moving = self.points[index]
+        wall = float(moving[:, axis].min()) - self.radii[index]
+        other = 1 - axis
+
+        # Spatial neighbours: pieces overlapping the band swept by the slide, behind it
+        band = ((low[:, other] < high[index, other] - EPS) & (high[:, other] > low[index, other] + EPS) &
+                (low[:, axis] < high[index, axis] - EPS))
+        band[index] = False
+        neighbours = np.flatnonzero(band)
+        if len(neighbours) == 0:
+            return wall
+
+        direction = np.zeros(2)
+        direction[axis] = -1.0
+        reach = self.radii[index] + self.radii[neighbours]  # Both pieces' growth
+
+        # Their vertices and edges, each tagged with the combined radius of its pair
+        vertices = np.concatenate([self.points[k] for k in neighbours])
+        vertex_reach = np.repeat(reach, [len(self.points[k]) for k in neighbours])
+        pieces = [self.edges(k) for k in neighbours]
+        starts = np.concatenate([start for start, _ in pieces])
+        edges = np.concatenate([edge for _, edge in pieces])
+        normals = np.concatenate([self.normals[k] for k in neighbours])
+        edge_reach = np.repeat(reach, [len(edge) for _, edge in pieces])
+
+        # Our vertices running into their (grown) edges and vertex discs ...
+        distance = min(wall,
+                       ray_edges(moving, direction, starts, edges, normals, edge_reach[None]),
+                       ray_discs(moving, direction, vertices, vertex_reach[None]))
+        # ... and their vertices running backwards into our grown edges
+        own_starts, own_edges = self.edges(index)
+        return min(distance, ray_edges(vertices, -direction, own_starts, own_edges,
+                                       self.normals[index], vertex_reach[:, None]))
+
+    def compact(self, max_rounds=100, tol=1e-6):
+        """Run slide passes until no piece moves by more than `tol`. Returns the rounds used."""
+        for rounds in range(1, max_rounds + 1):
+            moved = False
+            low, high = self.boxes()
+            order = np.argsort(low[:self.movable].sum(axis=1), kind="stable")
+            for index in order:
+                for axis in (0, 1):  # Left, then down
+                    distance = self.contact_distance(index, axis, low, high)
+                    if distance > tol:
+                        self.points[index][:, axis] -= distance
+                        self.moved[index][axis] -= distance
+                        low[index, axis] -= distance
+                        high[index, axis] -= distance
+                        moved = True
+            if not moved:
+                return rounds
+        return max_rounds
+
+def region_obstacles(region, raster=False):
+    # Holes, defects and the area outside an irregular outline, as fixed convex
+    # pieces: exact, or the blocked pixels for layouts placed on the raster
+    if region is None or not region.irregular:
+        return []
+    if raster:
+        return [[(x, y), (x + w, y), (x + w, y + h), (x, y + h)] for x, y, w, h in region.blocked_boxes()]
+    return region.blocked_pieces()
+
+def compact_parallelograms(parallelograms, spacing=0, region=None, **kwargs):
+    """Compact a Tri3.place_parallelograms layout in place (kerf- and region-aware)."""
+    placed = [p for p in parallelograms if p.placed]
+    grows = [(spacing if p.spacing is None else p.spacing) / 2 for p in placed]
+    compactor = Compactor([p.get_footprint(g) + p.position for p, g in zip(placed, grows)],
+                          fixed=region_obstacles(region))
+    rounds = compactor.compact(**kwargs)
+    for piece, moved in zip(placed, compactor.moved):
+        piece.position = (piece.position[0] + moved[0], piece.position[1] + moved[1])
+    return rounds
+
+def compact_shapes(shapes, spacing=0, region=None, **kwargs):
+    """Compact a circletry3.pack_shapes layout in place (kerf- and region-aware)."""
+    placed = [s for s in shapes if s.placed]
+    polygons, radii = [], []
+    for shape in placed:
+        # Each outline grown by a disc of half the spacing: exact kerf, and it stays
+        # inside the box pack_shapes reserved for the shape
+        grow = (spacing if shape.spacing is None else shape.spacing) / 2
+        x, y = shape.position
+        width, height = shape.get_bounding_box()
+        if shape.type == "circle":
+            r = shape.dims[0]
+            polygons.append([(x + r, y + r)])
+            radii.append(r + grow)
+        elif shape.type == "triangle":
+            polygons.append([(x, y + height), (x + width, y + height), (x + width / 2, y)])
+            radii.append(grow)
+        else:
+            polygons.append([(x, y), (x + width, y), (x + width, y + height), (x, y + height)])
+            radii.append(grow)
+    compactor = Compactor(polygons, radii, fixed=region_obstacles(region, raster=True))
+    rounds = compactor.compact(**kwargs)
+    for shape, moved in zip(placed, compactor.moved):
+        shape.position = (shape.position[0] + moved[0], shape.position[1] + moved[1])
+    return rounds
+
+def compact_triangles(packer, **kwargs):
+    """Compact a Tri1/Tri2 TrianglePacker layout in place (kerf- and region-aware)."""
+    compactor = Compactor([np.array(p.exterior.coords[:-1]) for p in packer.footprints],
+                          fixed=region_obstacles(packer.region))
+    rounds = compactor.compact(**kwargs)
+    for i, (dx, dy) in enumerate(compactor.moved):
+        packer.placed_triangles[i] = translate(packer.placed_triangles[i], dx, dy)
+        packer.footprints[i] = translate(packer.footprints[i], dx, dy)
+    if hasattr(packer, "redraw_grid"):
+        packer.redraw_grid()  # Tri2 keeps an ASCII picture of the layout
+    return rounds
+
+def compact_parts(sheet, **kwargs):
+    """Compact a nesting1 Sheet in place (region-aware)."""
+    compactor = Compactor([np.array([(x + part.x_offset, y + part.y_offset) for x, y in part.points])
+                           for part in sheet.parts], fixed=region_obstacles(sheet.region))
+    rounds = compactor.compact(**kwargs)
+    for part, (dx, dy) in zip(sheet.parts, compactor.moved):
+        part.x_offset += dx
+        part.y_offset += dy
+    return rounds
+
+
+if __name__ == "__main__":
+    from circletry3 import Shape, pack_shapes
+
+    shapes = [Shape("rectangle", (100, 50)), Shape("circle", (50,)), Shape("circle", (30,)),
+              Shape("square", (40,)), Shape("triangle", (60, 30)), Shape("rectangle", (80, 40)),
+              Shape("circle", (20,)), Shape("triangle", (20, 10)), Shape("circle", (10,))]
+    pack_shapes((300, 500), shapes, spacing=2)
+    before = [shape.position for shape in shapes]
+    rounds = compact_shapes(shapes, spacing=2)
+    print(f"Compacted in {rounds} rounds")
+    for shape, old in zip(shapes, before):
+        print(f"{shape.type} {shape.dims}: {old} -> ({shape.position[0]:.1f}, {shape.position[1]:.1f})")
@@ -0,0 +1,200 @@
+import math
+
+from circletry3 import pack_shapes
+from strip import lower_bound, restore
+
+try:
+    from ortools.sat.python import cp_model
+except ImportError:  # Optional: only needed for the exact backend
+    cp_model = None
+
+# Exact packing of small batches (10-30 shapes) with OR-Tools CP-SAT.
+# Rectangles, squares and triangles are packed by their bounding boxes, as
+# pack_shapes does; a circle only needs its center far enough from every other
+# circle and box, which CP-SAT handles exactly on the integer grid. Coordinates
+# are doubled internally so half a spacing is still a whole number.
+
+SCALE = 2
+
+STATUS = {}
+if cp_model is not None:
+    STATUS = {cp_model.OPTIMAL: "optimal", cp_model.FEASIBLE: "feasible",
+              cp_model.INFEASIBLE: "infeasible", cp_model.MODEL_INVALID: "invalid",
+              cp_model.UNKNOWN: "unknown"}
+
+def solve_exact(sheet_size, shapes, mode="sheet", values=None, spacing=0, time_limit=10.0,
+                workers=8, hint=True):
+    """Pack shapes optimally, or report how far from optimal the best layout found is.
+
+    mode="sheet": place a subset on a (height, width) sheet maximizing total value
+    (bounding-box area unless `values` is given). mode="strip": place everything on
+    a roll `sheet_size[1]` wide, minimizing the used length; sheet_size[0] caps it.
+
+    The greedy pack_shapes layout is used as the solver's starting hint and, when
+    the model allows it, its objective as a bound every worker shares from the
+    start; for strips the area bound from strip.lower_bound is shared too. Runs
+    `workers` parallel search workers for at most `time_limit` seconds and leaves
+    the shapes at the best layout found.
+
+    Returns {"status", "objective", "bound", "gap"}; gap is 0 when proven optimal.
+    "optimal" and the bound hold for layouts on the half-unit grid: pack_shapes
+    places circles at exact tangent points, so if the greedy layout does not fit
+    the grid and beats everything on it, it is kept and reported as "feasible"
+    without a bound.
+    """
+    if cp_model is None:
+        raise ImportError("solve_exact needs OR-Tools: pip install ortools")
+    if mode not in ("sheet", "strip"):
+        raise ValueError(f"Unknown mode: {mode!r}")
+
+    sheet_height, sheet_width = sheet_size
+    n = len(shapes)
+    values = [w * h for w, h in (shape.get_bounding_box() for shape in shapes)] if values is None else values
+    grows = [spacing if shape.spacing is None else shape.spacing for shape in shapes]  # Doubled half-spacing
+
+    # Greedy layout first: it seeds the solver and bounds the objective
+    pack_shapes(sheet_size, shapes, spacing=spacing)
+    greedy = [(shape.placed, shape.position) for shape in shapes]
+
+    model = cp_model.CpModel()
+    W, H = SCALE * sheet_width, SCALE * sheet_height
+    xs, ys, present, x_iv, y_iv, sizes = [], [], [], [], [], []
+    for i, shape in enumerate(shapes):
+        width, height = shape.get_bounding_box()
+        w, h = SCALE * width + 2 * grows[i], SCALE * height + 2 * grows[i]
+        p = model.NewConstant(1) if mode == "strip" else model.NewBoolVar(f"present{i}")
+        x = model.NewIntVar(0, max(W - w, 0), f"x{i}")
+        y = model.NewIntVar(0, max(H - h, 0), f"y{i}")
+        if w > W or h > H:
+            model.Add(p == 0)
+        xs.append(x)
+        ys.append(y)
+        present.append(p)
+        sizes.append((w, h))
+        x_iv.append(model.NewOptionalFixedSizeIntervalVar(x, w, p, f"xi{i}"))
+        y_iv.append(model.NewOptionalFixedSizeIntervalVar(y, h, p, f"yi{i}"))
+
+    circles = [i for i, shape in enumerate(shapes) if shape.type == "circle"]
+    boxes = [i for i in range(n) if i not in circles]
+
+    # Boxes among themselves: one global constraint with strong propagation
+    model.AddNoOverlap2D([x_iv[i] for i in boxes], [y_iv[i] for i in boxes])
+
+    # Circles against boxes: exact distance from the center to the box, so a circle
+    # may sit in a box's corner (gap_x^2 + gap_y^2 >= r^2, gaps 0 alongside the box)
+    for i in circles:
+        reach = sizes[i][0] // 2
+        cx, cy = xs[i] + reach, ys[i] + reach
+        for j in boxes:
+            gap_x = model.NewIntVar(0, W, "")
+            gap_y = model.NewIntVar(0, H, "")
+            gap_x2 = model.NewIntVar(0, W * W, "")
+            gap_y2 = model.NewIntVar(0, H * H, "")
+            model.AddMaxEquality(gap_x, [xs[j] - cx, cx - xs[j] - sizes[j][0], 0])
+            model.AddMaxEquality(gap_y, [ys[j] - cy, cy - ys[j] - sizes[j][1], 0])
+            model.AddMultiplicationEquality(gap_x2, [gap_x, gap_x])
+            model.AddMultiplicationEquality(gap_y2, [gap_y, gap_y])
+            both = [present[i], present[j]]
+            model.Add(gap_x2 + gap_y2 >= reach * reach).OnlyEnforceIf(both)
+            model.Add(gap_x + gap_y >= reach).OnlyEnforceIf(both)  # Redundant, propagates better
+
+    # Circles against circles: exact center distance, (dx^2 + dy^2 >= (ri + rj)^2)
+    for a, i in enumerate(circles):
+        for j in circles[a + 1:]:
+            reach = (sizes[i][0] + sizes[j][0]) // 2
+            dx = model.NewIntVar(-W, W, "")
+            dy = model.NewIntVar(-H, H, "")
+            dx2 = model.NewIntVar(0, W * W, "")
+            dy2 = model.NewIntVar(0, H * H, "")
+            model.Add(dx == xs[i] + sizes[i][0] // 2 - xs[j] - sizes[j][0] // 2)
+            model.Add(dy == ys[i] + sizes[i][1] // 2 - ys[j] - sizes[j][1] // 2)
+            model.AddMultiplicationEquality(dx2, [dx, dx])
+            model.AddMultiplicationEquality(dy2, [dy, dy])
+            model.Add(dx2 + dy2 >= reach * reach).OnlyEnforceIf([present[i], present[j]])
+
+    # The greedy layout can only bound the objective if the model allows it: circles
+    # tangent to their neighbours may overlap them once snapped to the grid
+    corners = [(int(round(SCALE * px - grows[i])), int(round(SCALE * py - grows[i])))
+               for i, (_, (px, py)) in enumerate(greedy)]
+
+    def clear(i, j):
+        # Circle i against circle or box j at the snapped greedy corners
+        reach = sizes[i][0] // 2
+        cx, cy = corners[i][0] + reach, corners[i][1] + reach
+        if j in circles:
+            reach += sizes[j][0] // 2
+            dx, dy = cx - corners[j][0] - sizes[j][0] // 2, cy - corners[j][1] - sizes[j][1] // 2
+        else:
+            dx = max(corners[j][0] - cx, cx - corners[j][0] - sizes[j][0], 0)
+            dy = max(corners[j][1] - cy, cy - corners[j][1] - sizes[j][1], 0)
+        return dx * dx + dy * dy >= reach * reach
+
+    greedy_valid = all(clear(i, j) for i in circles for j in range(n)
+                       if j != i and greedy[i][0] and greedy[j][0])
+
+    if mode == "sheet":
+        objective = sum(values[i] * present[i] for i in range(n))
+        model.Maximize(objective)
+        greedy_value = sum(values[i] for i in range(n) if greedy[i][0])
+        if greedy_valid:
+            model.Add(objective >= greedy_value)  # Shared bound: never worse than greedy
+    else:
+        length = model.NewIntVar(0, H, "length")
+        for i in range(n):
+            model.Add(ys[i] + sizes[i][1] <= length)
+        # Shared bounds: the area bound below, the greedy layout (if it fit) above
+        model.Add(length >= int(math.ceil(SCALE * lower_bound(sheet_width, shapes, spacing))))
+        greedy_value = None
+        if all(placed for placed, _ in greedy):
+            greedy_value = max(int(math.ceil(SCALE * py + sizes[i][1] - grows[i]))
+                               for i, (_, (px, py)) in enumerate(greedy))
+            if greedy_valid:
+                model.Add(length <= greedy_value)
+        model.Minimize(length)
+
+    if hint:
+        for i, (placed, _) in enumerate(greedy):
+            if mode == "sheet":
+                model.AddHint(present[i], placed)
+            if placed:
+                model.AddHint(xs[i], corners[i][0])
+                model.AddHint(ys[i], corners[i][1])
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.num_workers = workers
+    status = solver.Solve(model)
+    solved = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+
+    # A greedy layout the model cannot express may still beat everything the model allows
+    if not greedy_valid and greedy_value is not None and (
+            not solved or (solver.ObjectiveValue() < greedy_value if mode == "sheet"
+                           else solver.ObjectiveValue() > greedy_value)):
+        restore(shapes, greedy)
+        value = greedy_value if mode == "sheet" else greedy_value / SCALE
+        return {"status": "feasible", "objective": float(value), "bound": None, "gap": None}
+
+    if not solved:
+        restore(shapes, greedy)
+        return {"status": STATUS.get(status, "unknown"), "objective": None, "bound": None, "gap": None}
+
+    for i, shape in enumerate(shapes):
+        shape.placed = bool(solver.Value(present[i]))
+        shape.position = ((solver.Value(xs[i]) + grows[i]) / SCALE, (solver.Value(ys[i]) + grows[i]) / SCALE)
+    value, bound = solver.ObjectiveValue(), solver.BestObjectiveBound()
+    if mode == "strip":
+        value, bound = value / SCALE, bound / SCALE
+    gap = 0.0 if status == cp_model.OPTIMAL else abs(bound - value) / max(abs(value), 1e-9)
+    return {"status": STATUS[status], "objective": value, "bound": bound, "gap": gap}
+
+if __name__ == "__main__":
+    from circletry3 import Shape
+
+    shapes = [Shape("rectangle", (100, 50)), Shape("circle", (50,)), Shape("circle", (30,)),
+              Shape("circle", (20,)), Shape("square", (40,)), Shape("triangle", (60, 30)),
+              Shape("rectangle", (80, 40)), Shape("rectangle", (200, 100)), Shape("circle", (10,)),
+              Shape("square", (10,))]
+    result = solve_exact((300, 300), shapes, mode="strip", time_limit=10)
+    print(f"{result['status']}: length {result['objective']} (bound {result['bound']}, gap {result['gap']:.1%})")
+    for shape in shapes:
+        print(shape.type, shape.dims, shape.position)
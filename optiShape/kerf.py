@@ -0,0 +1,64 @@
+from functools import lru_cache
+
+import numpy as np
+
+# Kerf / minimum spacing: every piece is grown by half of its spacing, so two
+# pieces whose grown outlines at most touch are (s1 + s2) / 2 apart. Growing
+# happens once per piece and rotation; the overlap checks then run on the grown
+# outlines exactly as they would on the pieces themselves.
+
+# Longest mitre allowed, in units of the offset distance; sharper corners are
+# bevelled there instead of growing a spike of length distance / sin(angle / 2)
+MITRE_LIMIT = 2.0
+
+def offset_convex(points, distance, mitre_limit=MITRE_LIMIT):
+    """Grow a convex polygon by `distance` with mitred corners.
+
+    A corner whose mitre would reach further than `mitre_limit * distance` is
+    cut off square to its bisector at that distance, which adds one vertex; with
+    mitre_limit=None the result keeps the vertex count of the original. Either
+    way the corners cover the rounded offset, so the spacing is never undercut.
+    """
+    pts = np.asarray(points, dtype=float)
+    if distance == 0:
+        return pts.copy()
+    following = np.roll(pts, -1, axis=0)
+    edges = following - pts
+    normals = np.stack([edges[:, 1], -edges[:, 0]], axis=1)
+    if np.sum(pts[:, 0] * following[:, 1] - following[:, 0] * pts[:, 1]) < 0:
+        normals = -normals  # Keep normals pointing outwards for either winding
+    with np.errstate(divide="ignore", invalid="ignore"):
+        normals /= np.linalg.norm(normals, axis=1)[:, None]
+
+    # Vertex i joins edge i - 1 and edge i; move it to where both shifted edges meet.
+    # Degenerate (flat) polygons have no such point and come out non-finite.
+    previous = np.roll(normals, 1, axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mitred = pts + distance * (previous + normals) / (1 + np.sum(previous * normals, axis=1))[:, None]
+    if mitre_limit is None or distance < 0:
+        return mitred  # A shrunk polygon keeps its sharp corners exactly
+    reach = mitre_limit * distance
+    spiked = np.flatnonzero(np.linalg.norm(mitred - pts, axis=1) > reach)  # NaN never compares
+    if len(spiked) == 0:
+        return mitred
+
+    # The bevel is the line at `reach` along the bisector; the convex polygon lies
+    # behind the vertex along it, so nothing within `distance` of it is cut away.
+    # Its ends are where it crosses the two shifted edges.
+    result = []
+    for i in range(len(pts)):
+        if i not in spiked:
+            result.append(mitred[i])
+            continue
+        bisector = previous[i] + normals[i]
+        bisector /= np.linalg.norm(bisector)
+        for normal, edge in ((previous[i], edges[i - 1]), (normals[i], edges[i])):
+            along = edge / np.linalg.norm(edge)
+            shift = (reach - distance * normal @ bisector) / (along @ bisector)
+            result.append(pts[i] + distance * normal + shift * along)
+    return np.array(result)
+
+@lru_cache(maxsize=None)
+def inflated(points, distance):
+    """Cached offset_convex for a hashable tuple of (x, y) points; returns a tuple."""
+    return tuple((float(x), float(y)) for x, y in offset_convex(points, distance))
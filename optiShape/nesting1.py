@@ -1,5 +1,6 @@
 import tkinter as tk
 import math
+from sheetmask import SheetRegion
 
 # Function to rotate a point (x, y) around the origin (0, 0) by angle theta (in radians)
 def rotate_point(x, y, angle):
@@ -19,9 +20,11 @@ class Part:
 
 
 class Sheet:
-    def __init__(self, width, height):
+    def __init__(self, width, height, region=None):
         self.width = width
         self.height = height
+        # Usable sheet area (outline, holes, defects); a clean rectangle by default
+        self.region = region or SheetRegion.rectangle(width, height)
         self.used_area = 0
         self.parts = []
 
@@ -32,8 +35,8 @@ class Sheet:
         min_y = min(part.points, key=lambda p: p[1])[1]
         max_y = max(part.points, key=lambda p: p[1])[1]
 
-        # Check if the shape fits inside the sheet
-        if min_x + x_offset < 0 or max_x + x_offset > self.width or min_y + y_offset < 0 or max_y + y_offset > self.height:
+        # Check if the shape fits inside the usable sheet area
+        if not self.region.contains([(x + x_offset, y + y_offset) for x, y in part.points]):
             return False
 
         # Check for overlap with already placed parts
@@ -59,6 +62,46 @@ class Sheet:
         self.used_area += (max_x - min_x) * (max_y - min_y)  # Simple bounding box area for now
 
 
+def part_area(part):
+    # Simple area calculation for a polygon (bounding box area for simplicity)
+    min_x = min(part.points, key=lambda p: p[0])[0]
+    max_x = max(part.points, key=lambda p: p[0])[0]
+    min_y = min(part.points, key=lambda p: p[1])[1]
+    max_y = max(part.points, key=lambda p: p[1])[1]
+    return (max_x - min_x) * (max_y - min_y)
+
+
+def iter_nest_parts(sheet, parts, stop=None):
+    # Sort parts by area (largest first)
+    parts.sort(key=part_area, reverse=True)
+
+    # Attempt to place each part on the sheet, yielding each part as soon as it is placed.
+    # The generator returns True if `stop` cut it short, False if it ran to the end.
+    x_offset = 10
+    y_offset = 10
+    for part in parts:
+        if stop is not None and stop():
+            return True  # Keep what is placed so far
+
+        # Try fitting part in its original orientation
+        if sheet.fits(part, x_offset, y_offset):
+            sheet.add_part(part, x_offset, y_offset)
+        # Try rotating the part and fit
+        elif sheet.fits(Part(part.points), x_offset, y_offset):
+            part.rotate()
+            sheet.add_part(part, x_offset, y_offset)
+        else:
+            # If it doesn't fit, move to the next row (simple heuristic)
+            x_offset = 10
+            y_offset += 50  # Adjust this based on part size to avoid overlap
+            if sheet.fits(part, x_offset, y_offset):
+                sheet.add_part(part, x_offset, y_offset)
+            else:
+                continue
+        yield part
+    return False
+
+
 class NestingApp:
     def __init__(self, root, sheet_width, sheet_height):
         self.root = root
@@ -85,34 +128,11 @@ class NestingApp:
         self.draw_nesting()
 
     def nest_parts(self):
-        # Sort parts by area (largest first)
-        self.parts.sort(key=lambda part: self.calculate_area(part), reverse=True)
-
-        # Attempt to place each part on the sheet
-        x_offset = 10
-        y_offset = 10
-        for part in self.parts:
-            # Try fitting part in its original orientation
-            if self.sheet.fits(part, x_offset, y_offset):
-                self.sheet.add_part(part, x_offset, y_offset)
-            # Try rotating the part and fit
-            elif self.sheet.fits(Part(part.points), x_offset, y_offset):
-                part.rotate()
-                self.sheet.add_part(part, x_offset, y_offset)
-            else:
-                # If it doesn't fit, move to the next row (simple heuristic)
-                x_offset = 10
-                y_offset += 50  # Adjust this based on part size to avoid overlap
-                if self.sheet.fits(part, x_offset, y_offset):
-                    self.sheet.add_part(part, x_offset, y_offset)
+        for _ in iter_nest_parts(self.sheet, self.parts):
+            pass
 
     def calculate_area(self, part):
-        # Simple area calculation for a polygon (bounding box area for simplicity)
-        min_x = min(part.points, key=lambda p: p[0])[0]
-        max_x = max(part.points, key=lambda p: p[0])[0]
-        min_y = min(part.points, key=lambda p: p[1])[1]
-        max_y = max(part.points, key=lambda p: p[1])[1]
-        return (max_x - min_x) * (max_y - min_y)
+        return part_area(part)
 
     def draw_nesting(self):
         # Draw the material sheet (rectangle)
@@ -132,15 +152,16 @@ class NestingApp:
         self.canvas.create_polygon(translated_points, fill="lightblue", outline="blue")
 
 
-# Set up the main Tkinter window
-root = tk.Tk()
+if __name__ == "__main__":
+    # Set up the main Tkinter window
+    root = tk.Tk()
 
-# Define the sheet size (e.g., 500x500 units)
-sheet_width = 500
-sheet_height = 500
+    # Define the sheet size (e.g., 500x500 units)
+    sheet_width = 500
+    sheet_height = 500
 
-# Create the NestingApp instance
-app = NestingApp(root, sheet_width, sheet_height)
+    # Create the NestingApp instance
+    app = NestingApp(root, sheet_width, sheet_height)
 
-# Run the Tkinter main loop
-root.mainloop()
+    # Run the Tkinter main loop
+    root.mainloop()
@@ -0,0 +1,233 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from multiprocessing import Array
+
+from circletry3 import Shape, pack_shapes
+from Tri3 import Parallelogram, place_parallelograms
+
+# One cancel flag and one started flag per in-flight job, shared with the worker
+# processes. Set by init_worker; in-process services pass their own flags with
+# each batch instead.
+cancel_flags = None
+started_flags = None
+
+def init_worker(flags, started):
+    global cancel_flags, started_flags
+    cancel_flags = flags
+    started_flags = started
+
+def run_job(job, flags=None, started=None):
+    """Pack one job in a worker; stops at its deadline or when its cancel flag is set.
+
+    Returns {"placements": [...], "complete": bool}, one (x, y) position or None per
+    piece in request order. An incomplete result is the best layout found so far.
+    """
+    flags = cancel_flags if flags is None else flags
+    started = started_flags if started is None else started
+    started[job["slot"]] = 1
+    stopped = [False]
+
+    def stop():
+        if flags[job["slot"]] or (job["deadline"] is not None and time.time() >= job["deadline"]):
+            stopped[0] = True
+        return stopped[0]
+
+    sheet_size = tuple(job["sheet_size"])
+    if job["kind"] == "shapes":
+        pieces = [Shape(shape_type, tuple(dims)) for shape_type, dims in job["pieces"]]
+        if not stop():
+            pack_shapes(sheet_size, pieces, stop=stop)
+    else:
+        pieces = [Parallelogram(*dims) for dims in job["pieces"]]
+        if not stop():
+            place_parallelograms(sheet_size, pieces, stop=stop)
+
+    placements = [tuple(piece.position) if piece.placed else None for piece in pieces]
+    return {"placements": placements, "complete": not stopped[0]}
+
+def run_batch(jobs, flags=None, started=None):
+    # Small jobs travel to a worker together to share the round-trip overhead
+    return [run_job(job, flags, started) for job in jobs]
+
+
+class PackingService:
+    """Asyncio front end that runs packing jobs on a process pool.
+
+    Small jobs (at most `small_job` pieces) arriving within `batch_window` seconds
+    of each other are sent to a worker as one batch of up to `max_batch` jobs.
+    Every job may carry a timeout; when it expires the worker stops and the
+    layout placed so far is returned with "complete": False. A job still waiting
+    for a worker at its deadline is answered right away with nothing placed. Cancelling the
+    awaiting coroutine stops the job in its worker as well.
+
+    With in_process=True the jobs run on threads of this process instead, which
+    is convenient for local testing.
+    """
+
+    KINDS = ("shapes", "parallelograms")
+
+    def __init__(self, workers=None, max_batch=8, batch_window=0.005, small_job=20,
+                 max_jobs=256, in_process=False):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.small_job = small_job
+        self.max_jobs = max_jobs
+        self.in_process = in_process
+        self.executor = None
+        self.queue = None
+        self.batcher = None
+        self.free_slots = None
+        self.flags = None
+        self.started = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def start(self):
+        self.flags = Array("b", self.max_jobs, lock=False)
+        self.started = Array("b", self.max_jobs, lock=False)
+        if self.in_process:
+            self.executor = ThreadPoolExecutor(self.workers)
+        else:
+            self.executor = ProcessPoolExecutor(self.workers, initializer=init_worker,
+                                                initargs=(self.flags, self.started))
+        self.free_slots = asyncio.Queue()
+        for slot in range(self.max_jobs):
+            self.free_slots.put_nowait(slot)
+        self.queue = asyncio.Queue()
+        self.batcher = asyncio.create_task(self.collect_batches())
+
+    async def close(self):
+        self.batcher.cancel()
+        try:
+            await self.batcher
+        except asyncio.CancelledError:
+            pass
+        # Jobs that never reached a worker fail instead of leaving their callers waiting
+        while not self.queue.empty():
+            self.abandon(*self.queue.get_nowait())
+        # Waiting for running jobs must not block the event loop
+        await asyncio.get_running_loop().run_in_executor(
+            None, partial(self.executor.shutdown, wait=True, cancel_futures=True))
+
+    def abandon(self, job, result):
+        self.free_slots.put_nowait(job["slot"])
+        if not result.done():
+            result.set_exception(RuntimeError("PackingService closed before the job ran"))
+
+    async def pack(self, kind, pieces, sheet_size, timeout=None):
+        """Pack `pieces` on a sheet of `sheet_size` (height, width) and return the layout.
+
+        shapes pieces are (type, dims) pairs as for circletry3.Shape, parallelograms
+        pieces are (base, height, angle) as for Tri3.Parallelogram.
+        """
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown job kind: {kind!r}")
+        slot = await self.free_slots.get()
+        self.flags[slot] = 0
+        self.started[slot] = 0
+        job = {
+            "kind": kind,
+            "pieces": list(pieces),
+            "sheet_size": tuple(sheet_size),
+            "deadline": None if timeout is None else time.time() + timeout,
+            "slot": slot,
+        }
+        loop = asyncio.get_running_loop()
+        result = loop.create_future()
+        if timeout is not None:
+            # The deadline holds even while the job waits for a busy worker
+            timer = loop.call_later(timeout, self.expire, job, result)
+            result.add_done_callback(lambda _: timer.cancel())
+        if len(job["pieces"]) <= self.small_job:
+            await self.queue.put((job, result))
+        else:
+            self.dispatch([(job, result)])
+        try:
+            return await asyncio.shield(result)
+        except asyncio.CancelledError:
+            # The caller gave up: make the worker drop the job at its next step
+            self.flags[slot] = 1
+            raise
+
+    def expire(self, job, result):
+        self.flags[job["slot"]] = 1  # A running job stops and reports what it placed
+        if not self.started[job["slot"]] and not result.done():
+            result.set_result({"placements": [None] * len(job["pieces"]), "complete": False})
+
+    async def handle(self, request):
+        """Serve a JSON-style request, e.g. the body of an HTTP call.
+
+        {"kind": ..., "pieces": [...], "sheet_size": [h, w], "timeout": seconds}
+        """
+        return await self.pack(request["kind"], request["pieces"], request["sheet_size"],
+                               timeout=request.get("timeout"))
+
+    async def collect_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            closes = loop.time() + self.batch_window
+            try:
+                while len(batch) < self.max_batch:
+                    remaining = closes - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                for job, result in batch:
+                    self.abandon(job, result)  # Closed while this batch was filling up
+                raise
+            self.dispatch(batch)
+
+    def dispatch(self, batch):
+        jobs = [job for job, _ in batch]
+        # Worker processes got their flags at start
+        flags, started = (self.flags, self.started) if self.in_process else (None, None)
+        future = asyncio.get_running_loop().run_in_executor(self.executor, run_batch, jobs, flags, started)
+
+        def finished(done):
+            if done.cancelled():
+                # Cancelled by close() before a worker took the batch
+                for job, result in batch:
+                    self.abandon(job, result)
+                return
+            # Slots go back only once the worker is finished with them
+            for job, _ in batch:
+                self.free_slots.put_nowait(job["slot"])
+            for index, (_, result) in enumerate(batch):
+                if result.done():
+                    continue
+                if done.exception() is not None:
+                    result.set_exception(done.exception())
+                else:
+                    result.set_result(done.result()[index])
+
+        future.add_done_callback(finished)
+
+
+if __name__ == "__main__":
+    async def main():
+        async with PackingService(workers=2) as service:
+            small = [("rectangle", (100, 50)), ("circle", (30,)), ("square", (40,))]
+            large = [(40, 20, angle) for angle in (0, 15, 30, 45)] * 50
+            results = await asyncio.gather(
+                *(service.pack("shapes", small, (300, 500)) for _ in range(10)),
+                service.pack("parallelograms", large, (500, 500), timeout=0.2),
+            )
+            for result in results:
+                placed = sum(p is not None for p in result["placements"])
+                print(f"Placed {placed}/{len(result['placements'])}, complete: {result['complete']}")
+
+    asyncio.run(main())
@@ -0,0 +1,225 @@
+import heapq
+import json
+import math
+from bisect import bisect_left, insort
+from itertools import count, islice
+
+import numpy as np
+
+def maximal_rectangles(sheet_width, sheet_height, occupied):
+    """Maximal free rectangles (x, y, width, height) of a sheet around occupied boxes."""
+    free = np.array([(0, 0, sheet_width, sheet_height)])
+    for box in occupied:
+        free = split_free(free, box)[0]
+    return [tuple(rect) for rect in free.tolist()]
+
+def split_free(free, box):
+    """Maximal free rectangles, an (n, 4) array, after one more box is occupied.
+
+    Only the rectangles the box overlaps are split, into the up to four strips
+    left, right, above and below it. A strip lies inside the rectangle it came
+    from, so no untouched rectangle can be inside a strip; only the strips are
+    checked for being contained in another rectangle, with one vectorized test.
+    Returns the new array, the rectangles that went away and the strips that
+    were added (as lists of tuples).
+    """
+    ox, oy, ow, oh = box
+    fx, fy, fw, fh = free.T
+    hit = (ox < fx + fw) & (ox + ow > fx) & (oy < fy + fh) & (oy + oh > fy)
+    if not hit.any():
+        return free, [], []
+    gone = [tuple(rect) for rect in free[hit].tolist()]
+    strips = []
+    for fx, fy, fw, fh in gone:
+        if ox > fx:
+            strips.append((fx, fy, ox - fx, fh))
+        if ox + ow < fx + fw:
+            strips.append((ox + ow, fy, fx + fw - ox - ow, fh))
+        if oy > fy:
+            strips.append((fx, fy, fw, oy - fy))
+        if oy + oh < fy + fh:
+            strips.append((fx, oy + oh, fw, fy + fh - oy - oh))
+    kept = free[~hit]
+    if not strips:
+        return kept, gone, []
+    strips = np.array(strips)
+
+    # Of equal strips the first one stays
+    inner = contains(strips[None], strips[:, None])  # [i, j]: strip i inside strip j
+    order = np.arange(len(strips))
+    equal = inner & inner.T
+    inner &= ~equal | (order[None] < order[:, None])
+    np.fill_diagonal(inner, False)
+    covered = inner.any(axis=1) | contains(kept[None], strips[:, None]).any(axis=1)
+    strips = strips[~covered]
+    return np.concatenate([kept, strips]), gone, [tuple(rect) for rect in strips.tolist()]
+
+def contains(outer, inner):
+    # Elementwise over broadcast (..., 4) arrays of rectangles
+    return ((outer[..., 0] <= inner[..., 0]) & (outer[..., 1] <= inner[..., 1]) &
+            (inner[..., 0] + inner[..., 2] <= outer[..., 0] + outer[..., 2]) &
+            (inner[..., 1] + inner[..., 3] <= outer[..., 1] + outer[..., 3]))
+
+def shelf_fits(width, height, pieces):
+    """Quick check that (width, height) boxes fit a remnant in shelves, largest first."""
+    x, y, row_height = 0, 0, 0
+    for w, h in sorted(pieces, key=lambda p: (p[1], p[0]), reverse=True):
+        if w > width:
+            w, h = h, w  # Rotate to fit the width
+            if w > width:
+                return False
+        if x + w > width:
+            x, y, row_height = 0, y + row_height, 0
+        if y + h > height:
+            return False
+        x += w
+        row_height = max(row_height, h)
+    return True
+
+
+class RemnantInventory:
+    """Leftover free regions of packed sheets, reusable before opening a new sheet.
+
+    Each sheet's leftovers are stored as maximal free rectangles, bucketed by the
+    power-of-two class of their short side; each bucket is a list sorted by (area,
+    short side, long side). A lookup skips the buckets whose remnants are all too
+    narrow, bisects each remaining bucket to the set's total area (O(log n) per
+    bucket) and merges them in area order. Walking past remnants that fail the
+    long-side or fit check is linear in the worst case.
+    """
+
+    def __init__(self, min_size=1):
+        self.min_size = min_size  # Remnants narrower than this are not worth keeping
+        self.sheets = {}  # sheet_id -> {"size": (width, height), "occupied": [...]}
+        self.free = {}  # sheet_id -> maximal free rectangles, kept up to date box by box
+        self.buckets = {}  # short-side class -> sorted (area, short, long, seq, sheet_id, x, y, w, h)
+        self.sequence = count()  # Tie-break, so sheet ids of different types are never compared
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self.buckets.values())
+
+    @staticmethod
+    def size_class(short):
+        return int(math.floor(math.log2(max(short, 1))))
+
+    def add_sheet(self, sheet_id, sheet_width, sheet_height, occupied):
+        """Record a packed sheet by its occupied boxes (x, y, width, height)."""
+        if sheet_id in self.sheets:
+            self.drop(sheet_id)
+        self.sheets[sheet_id] = {"size": (sheet_width, sheet_height), "occupied": []}
+        self.free[sheet_id] = np.array([(0, 0, sheet_width, sheet_height)])
+        self.list_remnant(sheet_id, (0, 0, sheet_width, sheet_height))
+        self.consume(sheet_id, occupied)
+
+    def add_layout(self, sheet_id, sheet_size, shapes, spacing=0):
+        """Record a sheet packed by pack_shapes: sheet_size is (height, width).
+
+        Pass the `spacing` the sheet was packed with: each shape then occupies its
+        footprint grown by half its spacing, so remnants keep their share of the kerf.
+        """
+        occupied = []
+        for shape in shapes:
+            if shape.placed:
+                grow = (spacing if shape.spacing is None else shape.spacing) / 2
+                (x, y), (width, height) = shape.position, shape.get_bounding_box()
+                occupied.append((x - grow, y - grow, width + 2 * grow, height + 2 * grow))
+        self.add_sheet(sheet_id, sheet_size[1], sheet_size[0], occupied)
+
+    def drop(self, sheet_id):
+        for size_class, bucket in list(self.buckets.items()):
+            bucket[:] = [entry for entry in bucket if entry[4] != sheet_id]
+            if not bucket:
+                del self.buckets[size_class]
+
+    def list_remnant(self, sheet_id, rect):
+        x, y, w, h = rect
+        short = min(w, h)
+        if short >= self.min_size:
+            insort(self.buckets.setdefault(self.size_class(short), []),
+                   (w * h, short, max(w, h), next(self.sequence), sheet_id, x, y, w, h))
+
+    def unlist_remnant(self, sheet_id, rect):
+        x, y, w, h = rect
+        short = min(w, h)
+        if short >= self.min_size:
+            size_class = self.size_class(short)
+            bucket = self.buckets[size_class]
+            i = bisect_left(bucket, (w * h, short, max(w, h)))
+            while bucket[i][4:] != (sheet_id, x, y, w, h):
+                i += 1  # Past other remnants of the same size
+            del bucket[i]
+            if not bucket:
+                del self.buckets[size_class]
+
+    def smallest_fit(self, pieces, fits=shelf_fits):
+        """Smallest remnant that holds all (width, height) pieces, or None.
+
+        Returns (sheet_id, x, y, width, height). `fits(width, height, pieces)`
+        confirms a candidate; the default is a shelf-packing check.
+        """
+        if not pieces:
+            return None
+        area = sum(w * h for w, h in pieces)
+        short = max(min(w, h) for w, h in pieces)
+        longest = max(max(w, h) for w, h in pieces)
+        lowest = self.size_class(short)
+        candidates = heapq.merge(*(islice(bucket, bisect_left(bucket, (area,)), None)
+                                   for size_class, bucket in self.buckets.items() if size_class >= lowest))
+        for _, s, l, _, sheet_id, x, y, w, h in candidates:
+            if s >= short and l >= longest and fits(w, h, pieces):
+                return sheet_id, x, y, w, h
+        return None
+
+    def consume(self, sheet_id, occupied):
+        """Mark more of a sheet as used (boxes in sheet coordinates) and refresh its remnants.
+
+        Only the free rectangles the new boxes touch are split, and only the
+        remnants that changed move in the buckets.
+        """
+        removed, added = {}, {}  # Used as ordered sets
+        for box in occupied:
+            self.sheets[sheet_id]["occupied"].append(tuple(box))
+            self.free[sheet_id], gone, new = split_free(self.free[sheet_id], box)
+            for rect in gone:
+                if rect in added:
+                    del added[rect]  # Never listed
+                else:
+                    removed[rect] = True
+            added.update(dict.fromkeys(new, True))
+        for rect in removed:
+            self.unlist_remnant(sheet_id, rect)
+        for rect in added:
+            self.list_remnant(sheet_id, rect)
+
+    def remove_sheet(self, sheet_id):
+        del self.sheets[sheet_id]
+        del self.free[sheet_id]
+        self.drop(sheet_id)
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({"min_size": self.min_size,
+                       "sheets": [{"id": sheet_id, **sheet} for sheet_id, sheet in self.sheets.items()]}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        inventory = cls(min_size=data["min_size"])
+        for sheet in data["sheets"]:
+            inventory.add_sheet(sheet["id"], *sheet["size"], [tuple(box) for box in sheet["occupied"]])
+        return inventory
+
+
+if __name__ == "__main__":
+    inventory = RemnantInventory(min_size=10)
+    inventory.add_sheet("sheet-1", 500, 300, [(0, 0, 200, 100), (200, 0, 100, 50), (0, 100, 80, 40)])
+    inventory.add_sheet("sheet-2", 500, 300, [(0, 0, 500, 250)])
+
+    order = [(60, 30), (40, 40), (20, 10)]
+    found = inventory.smallest_fit(order)
+    print(f"{len(inventory)} remnants, smallest fit for {order}: {found}")
+    if found is not None:
+        sheet_id, x, y, _, _ = found
+        inventory.consume(sheet_id, [(x, y, 60, 30), (x + 60, y, 40, 40), (x + 100, y, 20, 10)])
+        print(f"{len(inventory)} remnants after using it")
@@ -0,0 +1,178 @@
+import math
+
+import cv2
+import numpy as np
+import shapely
+from shapely.geometry import Polygon, box
+from shapely.ops import unary_union
+from shapely.prepared import prep
+
+def pixel_outline(mask):
+    """The set pixels of a raster as shapely geometry, pixel (row, col) covering
+    [col, col + 1] x [row, row + 1].
+
+    Built from the contours of the raster upscaled by two, whose boundary pixel
+    centers lie a quarter pixel inside the edges; growing the contours back by a
+    quarter pixel gives the pixel edges. Pixels touching only at a corner are
+    bridged by a sliver, so the outline never undercuts the pixels.
+    """
+    upscaled = np.kron(np.asarray(mask, dtype=np.uint8), np.ones((2, 2), np.uint8))
+    contours, hierarchy = cv2.findContours(upscaled, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return Polygon()
+
+    def ring(contour):
+        points = (contour.reshape(-1, 2) + 0.5) / 2
+        return points if len(points) > 2 else np.concatenate([points, points + 1e-9])[:3]
+
+    polygons = []
+    for index, contour in enumerate(contours):
+        if hierarchy[0][index][3] >= 0:
+            continue  # A hole; added with its outer contour below
+        holes, child = [], hierarchy[0][index][2]
+        while child >= 0:
+            holes.append(ring(contours[child]))
+            child = hierarchy[0][child][0]
+        polygons.append(Polygon(ring(contour), holes))
+    return unary_union([polygon.buffer(0) for polygon in polygons]).buffer(0.25, join_style="mitre")
+
+
+class SheetRegion:
+    """Usable area of a sheet: an outline with holes, a forbidden raster, or both.
+
+    Everything is precomputed once so each placement check is cheap:
+    - `blocked`, a uint8 raster (1 = unusable pixel), and its integral image, so
+      a box check is four lookups however complex the outline is;
+    - `clearance`, the distance transform of the usable pixels, so a circle check
+      is one lookup;
+    - a prepared shapely polygon for exact checks of shapes whose bounding box
+      touches a blocked pixel.
+
+    Pixel (row, col) covers [col, col + 1) x [row, row + 1). A pixel is only usable
+    when all of it lies inside the outline and outside every hole.
+    """
+
+    def __init__(self, width, height, outline=None, holes=(), forbidden=None):
+        self.width = width
+        self.height = height
+        self.blocked = self.integral = self.clearance = self.geometry = None
+        self.irregular = False
+        if outline is None and not holes and forbidden is None:
+            return  # A clean rectangle: every check is a bounds test, no rasters needed
+        blocked = np.zeros((height, width), dtype=np.uint8)
+
+        geometry = None
+        if outline is not None or holes:
+            outline = outline if outline is not None else [(0, 0), (width, 0), (width, height), (0, height)]
+            geometry = Polygon(outline, [list(hole) for hole in holes]).intersection(box(0, 0, width, height))
+            rings = [np.round(np.array(ring)).astype(np.int32) for ring in [outline, *holes]]
+            usable = np.zeros((height, width), dtype=np.uint8)
+            cv2.fillPoly(usable, rings[:1], 1)
+            for ring in rings[1:]:
+                cv2.fillPoly(usable, [ring], 0)
+            # The raster is only trusted away from the edges: every pixel near an
+            # outline or hole edge is usable only if its whole square is inside
+            edge = np.zeros((height, width), dtype=np.uint8)
+            cv2.polylines(edge, rings, True, 1, thickness=7)
+            rows, cols = np.nonzero(edge)
+            shapely.prepare(geometry)
+            usable[rows, cols] = shapely.contains(geometry, shapely.box(cols, rows, cols + 1, rows + 1))
+            blocked |= 1 - usable
+        if forbidden is not None:
+            blocked |= np.asarray(forbidden, dtype=bool).astype(np.uint8)
+            if geometry is None:
+                geometry = box(0, 0, width, height)
+            # Forbidden pixels are cut out of the geometry too, along their outline
+            if np.any(forbidden):
+                geometry = geometry.difference(pixel_outline(forbidden))
+
+        self.blocked = blocked
+        self.integral = cv2.integral(blocked)
+        self.irregular = bool(blocked.any())
+        self.geometry = prep(geometry) if geometry is not None else None
+
+        # The sheet edge is checked exactly elsewhere, so pad with usable pixels
+        padded = cv2.copyMakeBorder(1 - blocked, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=1)
+        self.clearance = cv2.distanceTransform(padded, cv2.DIST_L2, cv2.DIST_MASK_PRECISE)[1:-1, 1:-1]
+
+    @classmethod
+    def rectangle(cls, width, height):
+        # A clean rectangular sheet; every check reduces to a bounds test, and width
+        # and height may be floats
+        return cls(width, height)
+
+    def box_free(self, x, y, width, height):
+        """True if the box lies on the sheet and covers no blocked pixel (O(1))."""
+        x1, y1 = x + width, y + height
+        if x < 0 or y < 0 or x1 > self.width or y1 > self.height:
+            return False
+        if not self.irregular:
+            return True
+        c0, r0 = int(math.floor(x)), int(math.floor(y))
+        c1, r1 = int(math.ceil(x1)), int(math.ceil(y1))
+        table = self.integral
+        return table[r1, c1] - table[r0, c1] - table[r1, c0] + table[r0, c0] == 0
+
+    def contains(self, points):
+        """True if the polygon given by `points` lies within the usable area."""
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        min_x, min_y, max_x, max_y = min(xs), min(ys), max(xs), max(ys)
+        if self.box_free(min_x, min_y, max_x - min_x, max_y - min_y):
+            return True
+        if (not self.irregular or self.geometry is None or
+                min_x < 0 or min_y < 0 or max_x > self.width or max_y > self.height):
+            return False
+        return self.geometry.contains(Polygon(points))
+
+    def blocked_boxes(self):
+        """Blocked pixels as axis-aligned boxes (x, y, width, height).
+
+        Each row's runs of blocked pixels are merged with identical runs in the
+        rows below, so straight-edged holes and defects come out as one box each.
+        """
+        boxes, open_runs = [], {}  # (start, stop) -> first row
+        for row in range(self.height + 1):
+            runs = set()
+            if row < self.height:
+                edges = np.flatnonzero(np.diff(np.concatenate([[0], self.blocked[row], [0]]).astype(np.int8)))
+                runs = set(zip(edges[::2].tolist(), edges[1::2].tolist()))
+            for run in [run for run in open_runs if run not in runs]:
+                top = open_runs.pop(run)
+                boxes.append((run[0], top, run[1] - run[0], row - top))
+            for run in runs:
+                open_runs.setdefault(run, row)
+        return boxes
+
+    def blocked_pieces(self):
+        """The exact unusable area inside the sheet as convex pieces (triangles).
+
+        Each piece is a list of (x, y) vertices, e.g. for fixed obstacles in compaction.
+        """
+        if self.geometry is None:
+            return []
+        blocked = box(0, 0, self.width, self.height).difference(self.geometry.context)
+        return [list(triangle.exterior.coords[:-1])
+                for triangle in shapely.constrained_delaunay_triangles(blocked).geoms]
+
+    def circles_free(self, centers, r):
+        """Vectorized: True where a circle of radius r at each center misses every blocked pixel.
+
+        Sheet bounds are not checked here. The pixel-based distance is conservative.
+        """
+        centers = np.asarray(centers, dtype=float).reshape(-1, 2)
+        if not self.irregular:
+            return np.ones(len(centers), dtype=bool)
+        cols = np.clip(centers[:, 0].astype(int), 0, self.width - 1)
+        rows = np.clip(centers[:, 1].astype(int), 0, self.height - 1)
+        return self.clearance[rows, cols] - math.sqrt(2) >= r
+
+
+if __name__ == "__main__":
+    # 500 x 300 sheet with a clamp zone in one corner and a defect hole
+    region = SheetRegion(500, 300,
+                         outline=[(0, 0), (500, 0), (500, 260), (460, 300), (0, 300)],
+                         holes=[[(200, 100), (260, 100), (260, 140), (200, 140)]])
+    print(region.box_free(0, 0, 100, 100), region.box_free(190, 90, 30, 30))
+    print(region.contains([(300, 150), (340, 150), (320, 180)]), region.contains([(470, 250), (499, 250), (499, 290)]))
+    print(region.circles_free([(100, 100), (230, 120)], 20))
@@ -0,0 +1,109 @@
+import math
+
+import numpy as np
+
+from circletry3 import iter_pack_shapes
+from compaction import compact_shapes
+
+# Strip packing for roll stock: the width across the roll is fixed and the goal
+# is the shortest used length. Length runs along y, the direction pack_shapes
+# fills in.
+
+def shape_area(shape):
+    if shape.type == "circle":
+        return math.pi * shape.dims[0] ** 2
+    width, height = shape.get_bounding_box()
+    return width * height / 2 if shape.type == "triangle" else width * height
+
+def lower_bound(width, shapes, spacing=0):
+    """No layout is shorter than this: the total area over the width, or the tallest shape."""
+    area = sum(shape_area(shape) for shape in shapes)
+    tallest = max(shape.get_bounding_box()[1] + (spacing if shape.spacing is None else shape.spacing)
+                  for shape in shapes)
+    return max(area / width, tallest)
+
+def used_length(shapes, spacing=0):
+    """How far down the roll the placed shapes reach, including their spacing."""
+    return max((shape.position[1] + shape.get_bounding_box()[1] +
+                (spacing if shape.spacing is None else shape.spacing) / 2
+                for shape in shapes if shape.placed), default=0)
+
+def snapshot(shapes):
+    return [(shape.placed, shape.position) for shape in shapes]
+
+def restore(shapes, layout):
+    for shape, (placed, position) in zip(shapes, layout):
+        shape.placed, shape.position = placed, position
+
+def probe(width, length, shapes, layout, spacing=0):
+    """Try to fit every shape within `length`, warm-started from a longer layout.
+
+    Shapes of `layout` that already end within `length` stay where they are;
+    only the ones that stick out are packed again around them.
+    """
+    restore(shapes, layout)
+    keep, rest = [], []
+    for shape in shapes:
+        grow = (spacing if shape.spacing is None else shape.spacing) / 2
+        if shape.placed and shape.position[1] + shape.get_bounding_box()[1] + grow <= length:
+            keep.append(shape)
+        else:
+            shape.placed = False
+            rest.append(shape)
+    sheet = np.ones((int(length), width, 3), dtype=np.uint8) * 255
+    for _ in iter_pack_shapes(sheet, rest, spacing=spacing, placed=keep):
+        pass
+    return all(shape.placed for shape in shapes)
+
+def pack_strip(width, shapes, spacing=0, compact=True, tolerance=1):
+    """Pack all shapes on a roll of the given width using as little length as possible.
+
+    Starts from a plain greedy layout on a roll long enough for anything, then
+    bisects the length between the lower bound and the best layout found. Each
+    probe is warm-started from the best layout so far. With `compact`, every
+    feasible layout is also slid towards the start of the roll.
+
+    Leaves the shapes at the best layout and returns {"length", "lower_bound",
+    "gap", "probes"}, where gap is the relative distance to the lower bound.
+    """
+    bound = lower_bound(width, shapes, spacing)
+    roll = sum(shape.get_bounding_box()[1] + (spacing if shape.spacing is None else shape.spacing)
+               for shape in shapes)
+    for shape in shapes:
+        shape.placed = False
+    sheet = np.ones((int(math.ceil(roll)), width, 3), dtype=np.uint8) * 255
+    for _ in iter_pack_shapes(sheet, shapes, spacing=spacing):
+        pass
+    if not all(shape.placed for shape in shapes):
+        raise ValueError("Some shapes are wider than the roll")
+    if compact:
+        compact_shapes(shapes, spacing=spacing)
+    best, best_length = snapshot(shapes), used_length(shapes, spacing)
+
+    low, probes = bound, 0
+    while best_length - low > tolerance:
+        length = (low + best_length) / 2
+        probes += 1
+        if probe(width, length, shapes, best, spacing):
+            if compact:
+                compact_shapes(shapes, spacing=spacing)
+            best, best_length = snapshot(shapes), used_length(shapes, spacing)
+        else:
+            low = length  # The greedy could not do it; stop looking this short
+
+    restore(shapes, best)
+    best_length = float(best_length)
+    return {"length": best_length, "lower_bound": float(bound),
+            "gap": (best_length - bound) / best_length if best_length else 0.0, "probes": probes}
+
+
+if __name__ == "__main__":
+    from circletry3 import Shape
+
+    shapes = [Shape("rectangle", (100, 50)), Shape("circle", (50,)), Shape("circle", (30,)),
+              Shape("circle", (20,)), Shape("square", (40,)), Shape("triangle", (60, 30)),
+              Shape("rectangle", (80, 40)), Shape("rectangle", (200, 100)), Shape("circle", (10,)),
+              Shape("square", (10,)), Shape("triangle", (20, 10)), Shape("rectangle", (5, 5))]
+    result = pack_strip(300, shapes, spacing=2)
+    print(f"Used length: {result['length']:.1f} (lower bound {result['lower_bound']:.1f}, "
+          f"gap {result['gap']:.1%}, {result['probes']} probes)")
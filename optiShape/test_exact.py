@@ -0,0 +1,30 @@
+import pytest
+
+pytest.importorskip("ortools")
+
+from circletry3 import Shape
+from exact import solve_exact
+
+
+@pytest.mark.parametrize("mode", ["sheet", "strip"])
+def test_circle_in_box_corner_is_not_infeasible(mode):
+    # pack_shapes puts the circle against the square's corner, inside its bounding
+    # box; that layout must not become a bound the model cannot reach
+    shapes = [Shape("square", (45,)), Shape("circle", (8,))]
+    result = solve_exact((60, 60), shapes, mode=mode, time_limit=5)
+    assert result["status"] in ("optimal", "feasible")
+    assert all(shape.placed for shape in shapes)
+
+
+def test_circle_fits_only_in_box_corner():
+    # The strips beside the square are narrower than the circle; only the corner
+    # holds it, so forcing bounding boxes apart would wrongly drop it
+    shapes = [Shape("square", (45,)), Shape("circle", (4,))]
+    result = solve_exact((52, 52), shapes, mode="sheet", time_limit=5)
+    assert result["status"] == "optimal"
+    assert all(shape.placed for shape in shapes)
+    r = 4
+    cx, cy = (c + r for c in shapes[1].position)
+    sx, sy = shapes[0].position
+    dx, dy = max(sx - cx, cx - sx - 45, 0), max(sy - cy, cy - sy - 45, 0)
+    assert dx * dx + dy * dy >= r * r